@@ -1,16 +1,18 @@
-from flask import Flask, render_template, request, jsonify, send_file
+import time
+# Début du démarrage (imports inclus), pour mesurer le temps jusqu'au préchauffage
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, send_file, g
 from flask_cors import CORS
 import cv2
-import numpy as np
 import io
 import base64
-import json
 import os
-import traceback
 import sys
-import time
-import tempfile
-import hashlib
+import hmac
+import functools
+import logging
+import uuid
 from datetime import datetime
 
 # Ajout du chemin pour les imports
@@ -22,133 +24,348 @@ CORS(app)  # Active CORS
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['SECRET_KEY'] = 'image-lab-pro-secret-key-2024'
 app.config['UPLOAD_FOLDER'] = 'temp_uploads'
+# Ordonnanceur de calcul : opérations lourdes simultanées et taille de file
+app.config['COMPUTE_MAX_CONCURRENT'] = int(os.environ.get('COMPUTE_MAX_CONCURRENT', 0)) or None
+app.config['COMPUTE_MAX_QUEUE'] = int(os.environ.get('COMPUTE_MAX_QUEUE', 16))
+app.config['COMPUTE_QUEUE_TIMEOUT'] = float(os.environ.get('COMPUTE_QUEUE_TIMEOUT', 10))
+# Streaming SSE : taille de l'aperçu basse résolution et intervalle keep-alive
+app.config['STREAM_PREVIEW_MAX_SIDE'] = 480
+app.config['STREAM_KEEPALIVE'] = 15
+# Au-delà (en pixels), JPEG progressif et TIFF compressé au téléchargement
+app.config['LARGE_IMAGE_PIXELS'] = 1920 * 1080
+# Histogramme : exact jusqu'à ce nombre de pixels, échantillonné au-delà
+app.config['HISTOGRAM_EXACT_MAX_PIXELS'] = 4 * 1024 * 1024
+app.config['HISTOGRAM_SAMPLE_PIXELS'] = 1024 * 1024
+# Séquencement des requêtes : sessions client suivies au plus, et durée
+# d'inactivité (secondes) après laquelle une session est oubliée
+app.config['SEQUENCER_MAX_SESSIONS'] = int(os.environ.get('SEQUENCER_MAX_SESSIONS', 10000))
+app.config['SEQUENCER_MAX_IDLE'] = float(os.environ.get('SEQUENCER_MAX_IDLE', 3600))
+# Balayage de paramètre : nombre de valeurs par requête et taille des miniatures
+app.config['SWEEP_MAX_VALUES'] = 64
+app.config['SWEEP_PREVIEW_MAX_SIDE'] = 160
+# Pool de processus : nombre de workers (0 = désactivé) et classes
+# d'opérations qui y sont envoyées (pixel, geometry, filter, histogram)
+app.config['PROCESS_POOL_WORKERS'] = int(os.environ.get('PROCESS_POOL_WORKERS', 0))
+app.config['PROCESS_POOL_CLASSES'] = [name.strip() for name in
+                                      os.environ.get('PROCESS_POOL_CLASSES', 'filter,histogram').split(',')
+                                      if name.strip()]
+# Durée de cache HTTP des rendus GET (adressés par contenu, donc immuables)
+app.config['RENDER_MAX_AGE'] = 365 * 24 * 3600
+# Codecs : backend imposé (opencv, pillow), sinon choisi par benchmark
+app.config['CODEC_BACKEND'] = os.environ.get('CODEC_BACKEND') or None
+app.config['CODEC_BENCHMARK'] = os.environ.get('CODEC_BENCHMARK', '1') != '0'
+# Sauvegarde des sessions sur disque (désactivable : SESSION_PERSISTENCE=0)
+app.config['SESSION_PERSISTENCE'] = os.environ.get('SESSION_PERSISTENCE', '1') != '0'
+# Durée de vie d'une session (secondes depuis l'upload) et intervalle de
+# l'expiration périodique des sessions sauvegardées
+app.config['SESSION_MAX_AGE'] = float(os.environ.get('SESSION_MAX_AGE', 3600))
+app.config['SESSION_EXPIRY_INTERVAL'] = float(os.environ.get('SESSION_EXPIRY_INTERVAL', 60))
+# Journalisation : niveau, format (text ou json) et fraction gardée des
+# événements des routes à haute fréquence (traitement, histogramme...)
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'text')
+app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 0.1))
+# Endpoints d'administration : en-tête X-Admin-Token exigé si défini,
+# sinon accès limité à la machine locale
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+
+from utils.structured_log import configure_logging, log_event, logging_stats
+from utils.process_pool import ProcessBackend, in_worker_process
+
+# Les requêtes déposent leurs journaux dans une file : l'écriture sur la
+# console se fait dans un thread dédié (inutile dans un worker du pool)
+if not in_worker_process():
+    configure_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'], app.config['LOG_SAMPLE_RATE'])
+logger = logging.getLogger('imagelab')
 
 # Créer le dossier temporaire s'il n'existe pas
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
 
-# Dictionnaires pour stocker les images par session
+from utils.original_store import OriginalStore
+from utils.session_persistence import SessionPersistence
+
+# Sessions sauvegardées sur disque (originaux .npy + index), rechargées
+# au démarrage sans lire les pixels
+session_persistence = (SessionPersistence(os.path.join(app.config['UPLOAD_FOLDER'], 'sessions'),
+                                          expire_interval=app.config['SESSION_EXPIRY_INTERVAL'])
+                       if app.config['SESSION_PERSISTENCE'] and not in_worker_process() else None)
+
+# Dictionnaires pour stocker les images par session (originales adressées
+# par leur contenu et partagées entre sessions)
 image_cache = {}
-original_images = {}
+original_images = OriginalStore(persistence=session_persistence)
 session_data = {}
 
-# Imports conditionnels
+if session_persistence is not None:
+    session_persistence.snapshot = lambda: {'originals': original_images.snapshot(),
+                                            'session_data': dict(session_data)}
+
+def restore_sessions():
+    """Recharge les sessions sauvegardées (index seulement, pixels à la demande)."""
+    restore_started = time.perf_counter()
+    saved_index = session_persistence.load_index()
+    restored = original_images.restore(saved_index.get('originals'))
+    cutoff = time.time() - app.config['SESSION_MAX_AGE']
+    session_data.update({sid: info for sid, info in saved_index.get('session_data', {}).items()
+                         if sid in original_images and info.get('upload_time', 0) >= cutoff})
+    # Sessions expirées pendant l'arrêt : leurs originaux quittent le disque
+    for session_id in [sid for sid, _ in original_images.sessions() if sid not in session_data]:
+        original_images.release(session_id)
+        restored -= 1
+    if restored:
+        log_event(logger, "♻️ Sessions rechargées", sessions=restored,
+                  duration_ms=round((time.perf_counter() - restore_started) * 1000, 2))
+
+from utils.plane_cache import PlaneCache, image_version
+from utils.buffer_pool import buffer_pool
+from utils.scheduler import (ComputeScheduler, SchedulerBusy, SlotCancelled,
+                             PRIORITY_INTERACTIVE, PRIORITY_DOWNLOAD)
+from utils.sequencer import RequestSequencer
+from utils.streaming import ChannelRegistry, sse_event
+from utils.encode_cache import EncodeCache
+from utils.image_codecs import MIMETYPES, codec_registry, decode_image, encode_image
+from utils.memory_report import MemoryTracer, process_rss
+from utils.request_profiler import RequestProfiler, server_timing
+from utils.tile_pyramid import PyramidCache
+from controllers.sweep_controller import SweepError, sweep_values, run_sweep, format_label, contact_sheet
+from utils.recipe import RecipeError, parse_recipe, canonical_recipe, render_etag
+from models.histogram_model import (CHANNEL_INDEX, channel_histogram, histogram_stats,
+                                    hue_saturation_histogram, sample_count,
+                                    sample_indices, sample_plane,
+                                    sampling_error_bound)
+
+# Plans dérivés (gris, YCrCb, Sobel) partagés par version d'image
+plane_cache = PlaneCache()
+
+# Limite les opérations lourdes simultanées (et les threads OpenCV)
+compute_scheduler = ComputeScheduler(
+    max_concurrent=app.config['COMPUTE_MAX_CONCURRENT'],
+    max_queue=app.config['COMPUTE_MAX_QUEUE'],
+    queue_timeout=app.config['COMPUTE_QUEUE_TIMEOUT']
+)
+
+# Numéros de séquence des requêtes interactives (dernière requête gagnante)
+request_sequencer = RequestSequencer(app.config['SEQUENCER_MAX_SESSIONS'],
+                                     app.config['SEQUENCER_MAX_IDLE'])
+
+# Canaux SSE ouverts par les clients
+stream_channels = ChannelRegistry()
+
+# Images encodées pour le téléchargement
+encode_cache = EncodeCache()
+
+# Pyramides de tuiles par (image, recette)
+pyramid_cache = PyramidCache()
+
+# Instantanés tracemalloc de l'endpoint mémoire
+memory_tracer = MemoryTracer()
+
+# Profilage à la demande (en-tête X-Profile ou ?profile=1, réservé à
+# l'administration) : derniers rapports gardés en mémoire
+request_profiler = RequestProfiler(root=current_dir)
+
+# Backend de codec imposé par la configuration (sinon benchmark au démarrage)
+codec_registry.forced = app.config['CODEC_BACKEND']
+
+# Opérations dont les paramètres sont en pixels absolus : pas d'aperçu réduit
+FULL_RES_ONLY_OPERATIONS = ('crop', 'resize')
+
+# Opérations pixel à pixel (et quasi linéaires) : une tuile traitée est la
+# tuile de l'original traitée, sans rendre l'image entière. Le seuillage,
+# non linéaire, donnerait des niveaux réduits différents.
+TILE_LOCAL_OPERATIONS = ('grayscale', 'brightness', 'contrast', 'channel_split')
+
+# Module de traitement : contrôleur principal, ou mode démo (sous-ensemble
+# des opérations) s'il ne peut pas être importé
 try:
-    from models.image_model import *
-    from controllers.preprocess_controller import process_image
+    from controllers.preprocess_controller import process_image, OPERATIONS
     HAS_MODULES = True
-    print("✓ Modules image chargés avec succès")
+    PROCESSING_MODULE = 'controllers.preprocess_controller'
+    MODULES_ERROR = None
 except ImportError as e:
-    print(f"✗ Erreur import modules: {e}")
+    from controllers.demo_controller import process_image, OPERATIONS
     HAS_MODULES = False
-    
-    # Mode démo
-    def convert_to_grayscale(image):
-        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    def process_image(operation, image, params=None, original_image=None):
-        print(f"Mode démo: {operation}")
-        if params is None:
-            params = {}
-        
-        # Utiliser l'originale si disponible
-        working_image = original_image if original_image is not None else image
-        
-        if operation == 'grayscale':
-            gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
-            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-        elif operation == 'blur':
-            return cv2.GaussianBlur(working_image, (5, 5), 0)
-        elif operation == 'brightness':
-            value = params.get('value', 0)
-            value = max(-100, min(100, value))
-            
-            if value > 0:
-                shadow = value
-                highlight = 255
-            else:
-                shadow = 0
-                highlight = 255 + value
-
-            alpha = (highlight - shadow) / 255
-            gamma = shadow
-            return cv2.addWeighted(working_image, alpha, working_image, 0, gamma)
-        elif operation == 'contrast':
-            value = params.get('value', 0)
-            f = 131 * (value + 127) / (127 * (131 - value))
-            alpha = f
-            gamma = 127 * (1 - f)
-            return cv2.addWeighted(working_image, alpha, working_image, 0, gamma)
-        elif operation == 'rotate':
-            angle = params.get('angle', 0)
-            (h, w) = working_image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            return cv2.warpAffine(working_image, M, (w, h))
-        elif operation == 'flip':
-            mode = params.get('mode', 'horizontal')
-            if mode == 'horizontal':
-                return cv2.flip(working_image, 1)
-            else:
-                return cv2.flip(working_image, 0)
-        elif operation == 'threshold':
-            gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
-            thresh_type = params.get('type', 'binary')
-            value = params.get('value', 127)
-            
-            if thresh_type == 'otsu':
-                _, result = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            elif thresh_type == 'adaptive':
-                result = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
-            else:
-                _, result = cv2.threshold(gray, value, 255, cv2.THRESH_BINARY)
-            
-            return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        elif operation == 'channel_split':
-            channel = params.get('channel', 'red')
-            b, g, r = cv2.split(working_image)
-            
-            if channel == 'red':
-                return cv2.merge([np.zeros_like(b), np.zeros_like(g), r])
-            elif channel == 'green':
-                return cv2.merge([np.zeros_like(b), g, np.zeros_like(r)])
-            elif channel == 'blue':
-                return cv2.merge([b, np.zeros_like(g), np.zeros_like(r)])
-            else:
-                return working_image
-        elif operation == 'edge_detection':
-            detector = params.get('detector', 'canny')
-            low = params.get('low', 50)
-            high = params.get('high', 150)
-            
-            gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
-            
-            if detector == 'canny':
-                edges = cv2.Canny(gray, low, high)
-                return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-            elif detector == 'sobel':
-                sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-                sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-                magnitude = cv2.magnitude(sobelx, sobely)
-                magnitude = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-                return cv2.cvtColor(magnitude, cv2.COLOR_GRAY2BGR)
-            elif detector == 'laplacian':
-                laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-                laplacian = cv2.normalize(laplacian, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-                return cv2.cvtColor(laplacian, cv2.COLOR_GRAY2BGR)
-            else:
-                edges = cv2.Canny(gray, low, high)
-                return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-        elif operation == 'histogram_equalization':
-            # Égalisation d'histogramme sur l'image en couleur
-            if len(working_image.shape) == 2:
-                return cv2.equalizeHist(working_image)
-            else:
-                ycrcb = cv2.cvtColor(working_image, cv2.COLOR_BGR2YCrCb)
-                ycrcb[:,:,0] = cv2.equalizeHist(ycrcb[:,:,0])
-                return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
-        
-        return working_image
+    PROCESSING_MODULE = 'controllers.demo_controller'
+    MODULES_ERROR = e
+
+from utils.warmup import Readiness
+
+# Aiguillage des opérations : pool de processus pour les classes
+# configurées, appel direct pour les autres
+process_backend = ProcessBackend(process_image,
+                                 workers=app.config['PROCESS_POOL_WORKERS'],
+                                 classes=app.config['PROCESS_POOL_CLASSES'])
+
+# Préchauffage (OpenCV, noyaux, codecs) en arrière-plan : /api/ready
+# répond 503 tant qu'il n'est pas terminé
+readiness = Readiness(STARTUP_STARTED)
+readiness.details = {'processing_module': PROCESSING_MODULE,
+                     'operations': list(OPERATIONS)}
+
+def decode_request_image(image_data, version=None):
+    """
+    Décode l'image base64 d'une requête en passant par le cache de plans.
+    Retourne les DerivedPlanes de cette version, ou None si le décodage échoue.
+    """
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+
+    def load():
+        return decode_image(base64.b64decode(image_data))
+
+    return plane_cache.get_or_load(version or image_version(image_data), load)
+
+def display_image(result, buffers=None):
+    """Met un résultat au format d'affichage : BGR sur 3 canaux."""
+    if len(result.shape) == 2:  # Niveaux de gris
+        dst = buffers.get('display', result.shape + (3,)) if buffers is not None else None
+        return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR, dst=dst)
+    if len(result.shape) == 3 and result.shape[2] == 4:  # RGBA
+        return result[:, :, :3]
+    return result
+
+def encode_data_url(image, format='png', **options):
+    """Encode une image en data URL base64."""
+    encoded = encode_image(image, format, **options)
+    return f'data:{MIMETYPES[format]};base64,' + base64.b64encode(encoded).decode('utf-8')
+
+def session_planes(session_id):
+    """Plans dérivés de l'image originale d'une session (None si inconnue)."""
+    if not session_id:
+        return None
+    entry = original_images.entry(session_id)
+    if entry is None:
+        return None
+    return session_planes_for_entry(entry)
+
+def session_planes_for_entry(entry):
+    """Plans dérivés d'un original du store."""
+    # Clé par contenu : les sessions qui partagent un original partagent ses plans
+    return plane_cache.get_or_load(('original', entry.digest), lambda: entry.image)
+
+def forget_original(digest):
+    """Oublie les plans et pyramides d'un original supprimé du store."""
+    plane_cache.invalidate(('original', digest))
+    pyramid_cache.invalidate_image(digest)
+
+# Toute suppression d'original (libération, remplacement, fichier perdu)
+# invalide les caches dérivés
+original_images.on_drop = forget_original
+
+def release_session(session_id):
+    """Oublie une session et libère son original s'il n'est plus référencé."""
+    original_images.release(session_id)
+    session_data.pop(session_id, None)
+    # Le client utilise l'identifiant de session pour séquencer ses requêtes
+    request_sequencer.forget(session_id)
+    if session_persistence is not None:
+        session_persistence.save_index()
+
+def expire_sessions():
+    """Libère les sessions uploadées depuis plus de SESSION_MAX_AGE ; retourne leur nombre."""
+    cutoff = time.time() - app.config['SESSION_MAX_AGE']
+    expired = [sid for sid, info in list(session_data.items()) if info['upload_time'] < cutoff]
+    for session_id in expired:
+        release_session(session_id)
+    if expired:
+        log_event(logger, "🧹 Sessions expirées", expired=len(expired), remaining=len(session_data))
+    return len(expired)
+
+if session_persistence is not None:
+    # Le thread d'écriture expire les sessions périodiquement
+    session_persistence.expire = expire_sessions
+
+def busy_response(error):
+    """Réponse 503 rapide avec Retry-After quand le calcul est saturé."""
+    response = jsonify({
+        'error': f'Serveur occupé: {error}',
+        'retry_after': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def request_sequence():
+    """
+    (session client, numéro de séquence) de la requête JSON courante, ou
+    None si le client n'en envoie pas.
+    """
+    data = request.get_json(silent=True) or {}
+    client_session = data.get('client_session')
+    seq = data.get('seq')
+    if not client_session or not isinstance(seq, int):
+        return None
+    return client_session, seq
+
+def is_superseded():
+    """Vrai si une requête plus récente de la même session est arrivée."""
+    sequence = g.get('sequence')
+    return sequence is not None and request_sequencer.is_stale(*sequence)
+
+def superseded_response():
+    """Réponse 409 pour une requête remplacée par une plus récente."""
+    client_session, seq = g.sequence
+    coalesced = request_sequencer.record_drop(client_session)
+    return jsonify({
+        'success': False,
+        'superseded': True,
+        'seq': seq,
+        'coalesced': coalesced
+    }), 409
+
+def is_admin_request():
+    """Vrai si la requête porte le jeton d'administration (ou est locale sans jeton)."""
+    token = app.config['ADMIN_TOKEN']
+    if token:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+def admin_required(view):
+    """Réserve une route à l'administration (jeton ou accès local)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({'error': 'Accès administrateur requis'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def scheduled(priority):
+    """
+    Exécute la vue dans un créneau de l'ordonnanceur de calcul.
+
+    Une requête séquencée qui attend en file est abandonnée dès qu'une
+    requête plus récente de la même session arrive.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.sequence = request_sequence()
+            if g.sequence is not None:
+                request_sequencer.announce(*g.sequence)
+                compute_scheduler.wake()
+            try:
+                with compute_scheduler.slot(priority, cancelled=is_superseded):
+                    return view(*args, **kwargs)
+            except SlotCancelled:
+                return superseded_response()
+            except SchedulerBusy as e:
+                return busy_response(e)
+        return wrapper
+    return decorator
+
+def download_encoding(format, quality, image):
+    """
+    Options d'encodage (encode_image) pour un téléchargement. Les grandes
+    images sont écrites en JPEG progressif ou en TIFF compressé (Deflate).
+    """
+    large = image.shape[0] * image.shape[1] >= app.config['LARGE_IMAGE_PIXELS']
+    if format == 'jpg':
+        return {'quality': quality, 'progressive': large, 'optimize': large}
+    if format == 'tiff':
+        return {'compress': large}
+    if format == 'webp':
+        return {'quality': quality}
+    return {}
 
 def cleanup_old_files():
     """Nettoyer les fichiers temporaires anciens"""
@@ -158,15 +375,48 @@ def cleanup_old_files():
             # Supprimer les fichiers de plus d'1 heure
             if os.path.isfile(filepath) and (time.time() - os.path.getmtime(filepath)) > 3600:
                 os.remove(filepath)
-                print(f"✓ Fichier temporaire nettoyé: {filename}")
+                log_event(logger, "✓ Fichier temporaire nettoyé", file=filename)
     except Exception as e:
-        print(f"✗ Erreur nettoyage: {e}")
+        logger.warning("✗ Erreur nettoyage: %s", e)
+
+@app.before_request
+def start_profiling():
+    """Profile la requête si elle le demande et y est autorisée."""
+    if not (request.headers.get('X-Profile') or request.args.get('profile')):
+        return
+    if not is_admin_request():
+        g.profile_denied = True
+        return
+    g.profile = request_profiler.begin()
 
 @app.before_request
 def before_request():
     """Nettoyage avant chaque requête"""
     cleanup_old_files()
 
+@app.after_request
+def finish_profiling(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        report = request_profiler.end(profile, method=request.method, path=request.full_path.rstrip('?'),
+                                      endpoint=request.endpoint, status=response.status_code,
+                                      # Réponse en flux : seul le début est profilé
+                                      streamed=response.is_streamed)
+        response.headers['X-Profile-Id'] = report['id']
+        response.headers['Server-Timing'] = server_timing(report)
+        log_event(logger, "⏱  Profil enregistré", profile=report['id'], path=report['path'],
+                  duration_ms=report['wall_ms'])
+    elif g.get('profile_denied'):
+        response.headers['X-Profile'] = 'denied'
+    return response
+
+@app.teardown_request
+def abandon_profiling(error=None):
+    # Exception non gérée : after_request n'a pas été appelé
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.disable()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -177,15 +427,125 @@ def health():
         'status': 'ok', 
         'modules': HAS_MODULES, 
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'scheduler': compute_scheduler.stats(),
+        'sequencer': request_sequencer.stats(),
+        'streams': stream_channels.stats(),
+        'encode_cache': encode_cache.stats(),
+        'tiles': pyramid_cache.stats(),
+        'originals': original_images.stats(),
+        'process_pool': process_backend.stats(),
+        'logging': logging_stats()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Prêt à servir : 200 une fois le préchauffage terminé, 503 avant."""
+    status = readiness.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+def session_memory():
+    """
+    Octets par session : original (partagé entre les sessions qui l'ont
+    uploadé, d'où la part attribuée) et plans dérivés en cache.
+
+    Retourne (sessions, octets comptés à la fois dans le store des
+    originaux et dans le cache de plans).
+    """
+    sessions = []
+    shared = {}
+    for session_id, entry in original_images.sessions():
+        planes = plane_cache.peek(('original', entry.digest))
+        derived = 0
+        if planes is not None:
+            derived = planes.nbytes
+            # Les plans d'un original référencent l'original lui-même
+            if planes.image is entry.image:
+                derived -= entry.image.nbytes
+                shared[entry.digest] = entry.image.nbytes
+        shared_by = max(entry.refcount, 1)
+        sessions.append({
+            'session_id': session_id,
+            'image_id': entry.digest,
+            'original_bytes': entry.nbytes,
+            'derived_bytes': derived,
+            'shared_by': shared_by,
+            'attributed_bytes': (entry.nbytes + derived) // shared_by
+        })
+    return sessions, sum(shared.values())
+
+@app.route('/api/admin/memory', methods=['GET'])
+@admin_required
+def memory_report():
+    """
+    Mémoire utilisée par les sessions, les caches et les tampons.
+
+    ?top=N : nombre de sessions (et de lignes tracemalloc) listées.
+    ?tracemalloc=start|diff|stop : instantané de référence, top-N des
+    écarts depuis cet instantané, arrêt du suivi.
+    """
+    top = max(1, min(100, request.args.get('top', 10, type=int)))
+    sessions, overlap = session_memory()
+    originals = original_images.stats()
+    stores = {
+        'originals': originals['bytes'],
+        'plane_cache': plane_cache.stats()['bytes'],
+        'encode_cache': encode_cache.stats()['bytes'],
+        'tile_cache': pyramid_cache.stats()['bytes'],
+        'buffer_pool': buffer_pool.stats()['bytes'],
+        'streams': stream_channels.stats()['bytes']
+    }
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'rss': process_rss(),
+        'stores': stores,
+        # Un original présent dans le cache de plans n'est compté qu'une fois
+        'total_bytes': sum(stores.values()) - overlap,
+        'sessions': {
+            'count': len(sessions),
+            'unique_images': originals['unique_images'],
+            'largest': sorted(sessions, key=lambda s: s['attributed_bytes'], reverse=True)[:top]
+        }
+    }
+
+    action = request.args.get('tracemalloc')
+    if action == 'start':
+        report['tracemalloc'] = memory_tracer.start()
+    elif action == 'stop':
+        report['tracemalloc'] = memory_tracer.stop()
+    elif action == 'diff':
+        diff = memory_tracer.diff(top)
+        if diff is None:
+            return jsonify({'error': 'tracemalloc inactif : appeler ?tracemalloc=start'}), 409
+        report['tracemalloc'] = dict(memory_tracer.status(), top=diff)
+    elif action:
+        return jsonify({'error': f'Action tracemalloc inconnue: {action}'}), 400
+    elif memory_tracer.active:
+        report['tracemalloc'] = memory_tracer.status()
+
+    return jsonify(report)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def profiles():
+    """Derniers rapports de profilage (requêtes envoyées avec X-Profile ou ?profile=1)."""
+    return jsonify({'profiles': request_profiler.summaries()})
+
+@app.route('/api/admin/profiles/<report_id>', methods=['GET'])
+@admin_required
+def profile_report(report_id):
+    """Rapport complet ; ?format=text pour la sortie pstats brute."""
+    report = request_profiler.get(report_id)
+    if report is None:
+        return jsonify({'error': 'Rapport de profilage inconnu'}), 404
+    if request.args.get('format') == 'text':
+        return Response(report['text'], mimetype='text/plain')
+    return jsonify(report)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_image():
+    started = time.perf_counter()
     try:
-        print(f"{'='*50}")
-        print(f"📤 Upload d'image - {datetime.now().strftime('%H:%M:%S')}")
-        
         if 'image' not in request.files:
             return jsonify({'error': 'Aucune image uploadée'}), 400
         
@@ -193,66 +553,77 @@ def upload_image():
         if file.filename == '':
             return jsonify({'error': 'Aucun fichier sélectionné'}), 400
         
-        print(f"📄 Fichier: {file.filename}, Taille: {len(file.read())} bytes")
-        file.seek(0)  # Retour au début du fichier
-        
         # Lire l'image
         file_bytes = file.read()
-        img_array = np.frombuffer(file_bytes, np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return jsonify({'error': 'Format d\'image invalide'}), 400
-        
-        print(f"📐 Dimensions originales: {image.shape[1]}x{image.shape[0]}")
         
-        # Redimensionner si trop grand (pour performance)
-        max_width, max_height = 1920, 1080
-        height, width = image.shape[:2]
-        
-        if width > max_width or height > max_height:
-            print(f"🔄 Redimensionnement de {width}x{height}")
-            scale = min(max_width/width, max_height/height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
+        def load_original():
+            # Redimensionner si trop grand (pour performance) : le décodeur
+            # peut déjà réduire un JPEG pendant le décodage
+            max_width, max_height = 1920, 1080
+            decoded = codec_registry.decode(file_bytes, fit=(max_width, max_height))
+            
+            if decoded is None:
+                return None
+            image, (width, height) = decoded
             
-            image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            print(f"📏 Nouvelles dimensions: {new_width}x{new_height}")
+            if image.shape[1] > max_width or image.shape[0] > max_height:
+                scale = min(max_width/width, max_height/height)
+                new_width = int(width * scale)
+                new_height = int(height * scale)
+                
+                image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+                log_event(logger, "🔄 Redimensionnement", logging.DEBUG,
+                          original=f'{width}x{height}', resized=f'{new_width}x{new_height}')
+            
+            return image, (width, height)
         
         # Générer un ID unique pour cette session
-        session_id = request.remote_addr + "_" + str(int(time.time()))
+        session_id = uuid.uuid4().hex
+        
+        # Stocker l'image originale : des octets déjà connus ne sont ni
+        # décodés ni redimensionnés, et ne coûtent aucune mémoire en plus
+        entry, deduplicated = original_images.add(session_id, file_bytes, load_original)
+        
+        if entry is None:
+            return jsonify({'error': 'Format d\'image invalide'}), 400
+        image = entry.image
         
-        # Encoder en base64 pour la réponse
-        _, buffer = cv2.imencode('.png', image)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Encoder en base64 pour la réponse (une seule fois par original)
+        if entry.data_url is None:
+            entry.data_url = encode_data_url(image)
         
-        # Stocker l'image originale
-        original_images[session_id] = image.copy()
         session_data[session_id] = {
-            'original_dimensions': (width, height),
+            'original_dimensions': entry.original_dimensions,
             'upload_time': time.time(),
             'filename': file.filename
         }
+        if session_persistence is not None:
+            session_persistence.save_index()
         
-        print(f"✅ Upload réussi - Session: {session_id[:10]}...")
-        print(f"{'='*50}")
+        log_event(logger, "📤 Upload", route='upload', session=session_id[:10], file=file.filename,
+                  bytes=len(file_bytes), dimensions=f'{image.shape[1]}x{image.shape[0]}',
+                  deduplicated=deduplicated, refcount=entry.refcount,
+                  duration_ms=round((time.perf_counter() - started) * 1000, 2))
         
         return jsonify({
             'success': True,
-            'image': f'data:image/png;base64,{img_base64}',
+            'image': entry.data_url,
             'dimensions': f'{image.shape[1]} × {image.shape[0]}',
             'size': len(file_bytes),
             'session_id': session_id,
+            'image_id': entry.digest,
             'color_mode': 'Couleur' if len(image.shape) == 3 else 'Niveaux de gris'
         })
         
     except Exception as e:
-        print(f"❌ Erreur upload: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Erreur upload: %s", e)
         return jsonify({'error': f'Erreur serveur: {str(e)}'}), 500
 
 @app.route('/api/process', methods=['POST'])
+@scheduled(PRIORITY_INTERACTIVE)
 def process():
+    started = time.perf_counter()
+    operation = None
     try:
         data = request.json
         operation = data.get('operation')
@@ -260,65 +631,254 @@ def process():
         image_data = data.get('image')
         session_id = data.get('session_id')
         
-        print(f"{'='*50}")
-        print(f"🔄 Traitement: {operation} - {datetime.now().strftime('%H:%M:%S')}")
-        print(f"📋 Paramètres: {params}")
-        
         if not image_data:
             return jsonify({'error': 'Aucune donnée image'}), 400
             
         if not operation:
             return jsonify({'error': 'Aucune opération spécifiée'}), 400
             
-        # Extraire les données base64
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        # Décoder l'image (ou la reprendre du cache si cette version est connue)
+        current_planes = decode_request_image(image_data)
         
-        # Décoder l'image
-        img_array = np.frombuffer(base64.b64decode(image_data), np.uint8)
-        current_image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if current_image is None:
+        if current_planes is None:
             return jsonify({'error': 'Échec du décodage de l\'image'}), 400
+        current_image = current_planes.image
         
         # Récupérer l'image originale si disponible
         original_image = None
-        if session_id and session_id in original_images:
-            original_image = original_images[session_id].copy()
-            print(f"📁 Image originale récupérée pour session: {session_id[:10]}...")
-        
-        # Traiter l'image
-        result = process_image(operation, current_image, params, original_image)
+        planes = current_planes
+        original_planes = session_planes(session_id)
+        if original_planes is not None:
+            original_image = original_planes.image
+            planes = original_planes
+        
+        # Traiter l'image dans des tampons empruntés au pool : le résultat
+        # doit être encodé avant de rendre le bail
+        with buffer_pool.lease() as buffers:
+            result = process_backend.process(operation, current_image, params, original_image, planes, buffers)
+        
+            if result is None:
+                log_event(logger, "⚠️ Résultat vide, image actuelle renvoyée", logging.WARNING,
+                          route='process', op=operation)
+                result = current_image
+        
+            # Assurer que l'image a le bon format pour l'affichage
+            result = display_image(result, buffers)
+        
+            # Inutile d'encoder un résultat qu'une requête plus récente remplace
+            if is_superseded():
+                return superseded_response()
+        
+            # Encoder le résultat
+            image_url = encode_data_url(result)
+        
+        log_event(logger, "🔄 Traitement", sampled=True, route='process', op=operation,
+                  session=(session_id or '')[:10], original=original_image is not None,
+                  dimensions=f'{result.shape[1]}x{result.shape[0]}', bytes=len(image_url),
+                  duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        return jsonify({
+            'success': True,
+            'image': image_url,
+            'operation': operation,
+            'dimensions': f'{result.shape[1]} × {result.shape[0]}',
+            'seq': g.sequence[1] if g.sequence else None,
+            'coalesced': request_sequencer.coalesced(g.sequence[0]) if g.sequence else 0
+        })
         
-        if result is None:
-            print("⚠️ Résultat vide, utilisation de l'image actuelle")
-            result = current_image
+    except Exception as e:
+        logger.exception("❌ Erreur traitement %s: %s", operation, e)
+        return jsonify({'error': f'Erreur traitement: {str(e)}'}), 500
+
+@app.route('/api/sweep', methods=['POST'])
+@scheduled(PRIORITY_INTERACTIVE)
+def sweep():
+    """
+    Évalue une opération pour une série de valeurs d'un paramètre
+    (seuils, couples Canny, tailles de noyau...) en une requête.
+    Retourne une planche contact légendée ou une liste de miniatures.
+    """
+    operation = None
+    try:
+        data = request.json or {}
+        operation = data.get('operation')
+        params = data.get('params') or {}
+        param = data.get('param')
+        image_data = data.get('image')
         
-        # Assurer que l'image a le bon format pour l'affichage
-        if len(result.shape) == 2:  # Niveaux de gris
-            result = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        elif len(result.shape) == 3 and result.shape[2] == 4:  # RGBA
-            result = result[:, :, :3]
+        if not image_data:
+            return jsonify({'error': 'Aucune donnée image'}), 400
+        if operation not in OPERATIONS:
+            return jsonify({'error': f'Opération inconnue: {operation}'}), 400
+        if not param:
+            return jsonify({'error': 'Aucun paramètre à balayer'}), 400
+        if operation in FULL_RES_ONLY_OPERATIONS:
+            return jsonify({'error': f'Balayage non disponible pour {operation}'}), 400
+        
+        values = sweep_values(data, app.config['SWEEP_MAX_VALUES'])
+        max_side = max(16, min(int(data.get('max_side') or app.config['SWEEP_PREVIEW_MAX_SIDE']), 512))
+        
+        # Un seul décodage et les mêmes plans pour toutes les valeurs
+        current_planes = decode_request_image(image_data)
+        if current_planes is None:
+            return jsonify({'error': 'Échec du décodage de l\'image'}), 400
+        planes = session_planes(data.get('session_id')) or current_planes
         
-        print(f"✅ Traitement réussi - Nouvelle taille: {result.shape[1]}x{result.shape[0]}")
+        log_event(logger, "🎚  Balayage", sampled=True, route='sweep', op=operation,
+                  param=param, values=len(values))
+        with buffer_pool.lease() as buffers:
+            thumbs, method = run_sweep(process_image, operation, planes, params, param,
+                                       values, max_side, buffers)
         
-        # Encoder le résultat
-        _, buffer = cv2.imencode('.png', result)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        if is_superseded():
+            return superseded_response()
         
-        return jsonify({
+        labels = [format_label(param, value) for value in values]
+        response = {
             'success': True,
-            'image': f'data:image/png;base64,{img_base64}',
             'operation': operation,
-            'dimensions': f'{result.shape[1]} × {result.shape[0]}'
+            'param': param,
+            'values': values,
+            'method': method,
+            'seq': g.sequence[1] if g.sequence else None
+        }
+        if data.get('output', 'sheet') == 'previews':
+            response['previews'] = [
+                {'value': value, 'image': encode_data_url(thumb, 'jpg', quality=80)}
+                for value, thumb in zip(values, thumbs)
+            ]
+        else:
+            sheet, cells = contact_sheet(thumbs, labels, data.get('columns'))
+            for cell, value in zip(cells, values):
+                cell['value'] = value
+            response['image'] = encode_data_url(sheet, 'jpg', quality=85)
+            response['cells'] = cells
+            response['dimensions'] = f'{sheet.shape[1]} × {sheet.shape[0]}'
+        return jsonify(response)
+        
+    except (SweepError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Balayage invalide: {str(e)}'}), 400
+    except Exception as e:
+        logger.exception("❌ Erreur balayage %s: %s", operation, e)
+        return jsonify({'error': f'Erreur balayage: {str(e)}'}), 500
+
+def run_stream_job(channel, job):
+    """
+    Traite une modification poussée sur un canal SSE : aperçu basse
+    résolution d'abord, puis image pleine résolution. Le travail est
+    abandonné dès qu'une modification plus récente attend sur le canal.
+    """
+    seq = job.get('seq')
+    operation = job['operation']
+    params = job.get('params') or {}
+    try:
+        with compute_scheduler.slot(PRIORITY_INTERACTIVE, cancelled=channel.has_pending):
+            current_planes = decode_request_image(job['image'], job['version'])
+            if current_planes is None:
+                yield sse_event('error', {'seq': seq, 'error': 'Échec du décodage de l\'image'})
+                return
+            planes = session_planes(job.get('session_id')) or current_planes
+            original_image = planes.image if planes is not current_planes else None
+
+            preview = None
+            if operation not in FULL_RES_ONLY_OPERATIONS:
+                small = planes.preview(app.config['STREAM_PREVIEW_MAX_SIDE'])
+                if small is not planes:
+                    result = display_image(process_image(operation, small.image, params, None, small))
+                    preview = {
+                        'seq': seq,
+                        'image': encode_data_url(result, 'jpg', quality=70),
+                        'dimensions': f'{result.shape[1]} × {result.shape[0]}'
+                    }
+        if preview is not None:
+            yield sse_event('preview', preview)
+
+        with compute_scheduler.slot(PRIORITY_INTERACTIVE, cancelled=channel.has_pending):
+            with buffer_pool.lease() as buffers:
+                result = process_backend.process(operation, current_planes.image, params,
+                                                 original_image, planes, buffers)
+                result = display_image(result, buffers)
+                if channel.has_pending():
+                    raise SlotCancelled()
+                image_url = encode_data_url(result)
+        yield sse_event('result', {
+            'seq': seq,
+            'image': image_url,
+            'operation': operation,
+            'dimensions': f'{result.shape[1]} × {result.shape[0]}',
+            'coalesced': channel.coalesced
+        })
+    except SlotCancelled:
+        yield sse_event('superseded', {'seq': seq})
+    except SchedulerBusy as e:
+        yield sse_event('busy', {'seq': seq, 'retry_after': e.retry_after})
+    except Exception as e:
+        logger.exception("❌ Erreur streaming %s: %s", operation, e)
+        yield sse_event('error', {'seq': seq, 'error': f'Erreur traitement: {str(e)}'})
+
+@app.route('/api/stream/<channel_id>', methods=['GET'])
+def stream(channel_id):
+    """Flux SSE persistant : aperçus et résultats des modifications poussées."""
+    channel = stream_channels.open(channel_id)
+    keepalive = app.config['STREAM_KEEPALIVE']
+
+    def events():
+        try:
+            yield sse_event('ready', {'channel': channel_id})
+            while not channel.closed:
+                job = channel.next_job(keepalive)
+                if job is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield from run_stream_job(channel, job)
+        finally:
+            stream_channels.close(channel_id, channel)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/stream/<channel_id>', methods=['POST'])
+def stream_push(channel_id):
+    """
+    Pousse une modification sur un canal ouvert. L'image n'est à envoyer
+    que lorsqu'elle change : le canal garde la dernière reçue.
+    """
+    try:
+        channel = stream_channels.get(channel_id)
+        if channel is None:
+            return jsonify({'error': 'Canal de streaming inconnu'}), 404
+        
+        data = request.json or {}
+        operation = data.get('operation')
+        if not operation:
+            return jsonify({'error': 'Aucune opération spécifiée'}), 400
+        
+        image_data = data.get('image')
+        if image_data:
+            if ',' in image_data:
+                image_data = image_data.split(',')[1]
+            channel.image_data = image_data
+            channel.image_version = image_version(image_data)
+        if channel.image_data is None:
+            return jsonify({'error': 'Aucune donnée image'}), 400
+        
+        channel.push({
+            'operation': operation,
+            'params': data.get('params', {}),
+            'seq': data.get('seq'),
+            'image': channel.image_data,
+            'version': channel.image_version,
+            'session_id': data.get('session_id')
         })
+        return jsonify({'success': True, 'seq': data.get('seq')}), 202
         
     except Exception as e:
-        print(f"❌ Erreur traitement {operation}: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'error': f'Erreur traitement: {str(e)}'}), 500
+        logger.exception("❌ Erreur streaming: %s", e)
+        return jsonify({'error': f'Erreur streaming: {str(e)}'}), 500
 
 @app.route('/api/histogram', methods=['POST'])
+@scheduled(PRIORITY_INTERACTIVE)
 def get_histogram():
     try:
         data = request.json
@@ -327,67 +887,114 @@ def get_histogram():
         
         if not image_data:
             return jsonify({'error': 'Aucune donnée image'}), 400
-            
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
         
-        # Décoder l'image
-        img_array = np.frombuffer(base64.b64decode(image_data), np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        # Classes de l'histogramme teinte/saturation (teinte OpenCV : 0..179)
+        try:
+            hue_bins = int(data.get('hue_bins', 30))
+            saturation_bins = int(data.get('saturation_bins', 32))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'hue_bins et saturation_bins doivent être des entiers'}), 400
+        if not (1 <= hue_bins <= 180 and 1 <= saturation_bins <= 256):
+            return jsonify({'error': 'hue_bins doit être entre 1 et 180, saturation_bins entre 1 et 256'}), 400
+            
+        # Décoder l'image (partagée avec /api/process pour la même version)
+        planes = decode_request_image(image_data)
         
-        if image is None:
+        if planes is None:
             return jsonify({'error': 'Échec du décodage de l\'image'}), 400
+        image = planes.image
+        
+        # Mode exact, échantillonné, ou automatique selon la taille de l'image
+        total_pixels = image.shape[0] * image.shape[1]
+        mode = data.get('mode', 'auto')
+        if mode == 'sampled' or (mode == 'auto' and total_pixels > app.config['HISTOGRAM_EXACT_MAX_PIXELS']):
+            count = sample_count(total_pixels, app.config['HISTOGRAM_SAMPLE_PIXELS'])
+        else:
+            count = total_pixels
+        # Pixels tirés au hasard (graine fixe) : mêmes indices pour tous les plans
+        indices = sample_indices(total_pixels, count) if count < total_pixels else None
+        # Les comptes échantillonnés sont ramenés à l'échelle de l'image entière
+        scale = total_pixels / count
         
         # Calculer l'histogramme selon le canal demandé
         hist_data = {}
+        histogram_2d = None
         
         if channel == 'rgb' and len(image.shape) == 3:
             # Histogramme pour chaque canal couleur
-            colors = ('blue', 'green', 'red')
-            for i, col in enumerate(colors):
-                hist = cv2.calcHist([image], [i], None, [256], [0, 256])
-                hist_data[col] = hist.flatten().tolist()
+            sampled = sample_plane(image, indices)
+            for col in ('blue', 'green', 'red'):
+                hist_data[col] = channel_histogram(sampled, CHANNEL_INDEX[col]) * scale
+                
         elif channel == 'gray':
-            # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-            hist_data['gray'] = hist.flatten().tolist()
-        elif channel in ['red', 'green', 'blue'] and len(image.shape) == 3:
+            # Plan de luminance du cache
+            hist_data['gray'] = channel_histogram(sample_plane(planes.gray, indices)) * scale
+            
+        elif channel in CHANNEL_INDEX and len(image.shape) == 3:
             # Canal spécifique
-            channel_map = {'red': 2, 'green': 1, 'blue': 0}
-            idx = channel_map[channel]
-            hist = cv2.calcHist([image], [idx], None, [256], [0, 256])
-            hist_data[channel] = hist.flatten().tolist()
+            hist_data[channel] = channel_histogram(sample_plane(image, indices),
+                                                   CHANNEL_INDEX[channel]) * scale
+            
+        elif channel == 'hue_saturation' and len(image.shape) == 3:
+            # Histogramme 2-D teinte/saturation (une seule passe sur le HSV)
+            hist_2d = hue_saturation_histogram(sample_plane(planes.hsv, indices),
+                                               hue_bins, saturation_bins) * scale
+            histogram_2d = {
+                'axes': ['hue', 'saturation'],
+                'ranges': [[0, 180], [0, 256]],
+                'data': hist_2d.tolist()
+            }
         
-        # Calculer les statistiques
+        # Statistiques des valeurs de pixels, calculées depuis les classes
         stats = {
             'min': {},
             'max': {},
             'mean': {},
-            'std': {}
+            'std': {},
+            'median': {},
+            'mode': {},
+            'percentiles': {},
+            'total_pixels': total_pixels
         }
         
         for channel_name, hist in hist_data.items():
-            if hist:
-                hist_array = np.array(hist)
-                stats['min'][channel_name] = float(np.min(hist_array))
-                stats['max'][channel_name] = float(np.max(hist_array))
-                stats['mean'][channel_name] = float(np.mean(hist_array))
-                stats['std'][channel_name] = float(np.std(hist_array))
+            channel_stats = histogram_stats(hist)
+            if channel_stats is None:
+                continue
+            for key, value in channel_stats.items():
+                stats[key][channel_name] = value
+            hist_data[channel_name] = hist.tolist()
+        
+        sampling = {
+            'mode': 'sampled' if indices is not None else 'exact',
+            'sampled_pixels': count
+        }
+        if indices is not None:
+            # Erreur maximale sur les rangs (percentiles), confiance 95 %
+            sampling['cdf_error_bound'] = sampling_error_bound(count)
+            sampling['confidence'] = 0.95
         
         return jsonify({
             'success': True,
             'histogram': hist_data,
             'channel': channel,
-            'stats': stats
+            'stats': stats,
+            'sampling': sampling,
+            'histogram_2d': histogram_2d,
+            'image_info': {
+                'width': image.shape[1],
+                'height': image.shape[0],
+                'channels': image.shape[2] if len(image.shape) == 3 else 1,
+                'total_pixels': image.shape[0] * image.shape[1]
+            }
         })
         
     except Exception as e:
-        print(f"❌ Erreur histogramme: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ Erreur histogramme: %s", e)
         return jsonify({'error': f'Erreur histogramme: {str(e)}'}), 500
 
 @app.route('/api/download', methods=['POST'])
+@scheduled(PRIORITY_DOWNLOAD)
 def download():
     try:
         data = request.json
@@ -396,70 +1003,264 @@ def download():
             return jsonify({'error': 'Aucune donnée image'}), 400
             
         format = data.get('format', 'png').lower()
-        quality = data.get('quality', 95)
+        if format == 'jpeg':
+            format = 'jpg'
+        if format not in ('jpg', 'tiff', 'webp'):
+            format = 'png'  # PNG par défaut
+        quality = max(1, min(100, int(data.get('quality', 95))))
         
         if ',' in image_data:
             image_data = image_data.split(',')[1]
+        version = image_version(image_data)
+        
+        # La qualité n'influence que les formats avec perte
+        cache_key = (version, format, quality if format in ('jpg', 'webp') else None)
+        encoded = encode_cache.get(cache_key)
+        
+        if encoded is None:
+            planes = decode_request_image(image_data, version)
+            
+            if planes is None:
+                return jsonify({'error': 'Échec du décodage de l\'image'}), 400
+            image = planes.image
             
-        img_array = np.frombuffer(base64.b64decode(image_data), np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+            encoded = encode_image(image, format, **download_encoding(format, quality, image))
+            
+            if encoded is None:
+                return jsonify({'error': 'Échec de l\'encodage de l\'image'}), 500
+            
+            encode_cache.put(cache_key, encoded)
         
-        if image is None:
-            return jsonify({'error': 'Échec du décodage de l\'image'}), 400
+        # Servi directement depuis la mémoire, sans fichier temporaire
+        return send_file(
+            io.BytesIO(encoded),
+            mimetype=MIMETYPES[format],
+            as_attachment=True,
+            download_name=f'image_traitee.{format}'
+        )
         
-        # Préparer les paramètres d'encodage
-        encode_params = []
-        filename = 'image_traitee'
-        
-        if format in ['jpg', 'jpeg']:
-            ext = '.jpg'
-            filename += '.jpg'
-            encode_params = [cv2.IMWRITE_JPEG_QUALITY, max(1, min(100, quality))]
-            mimetype = 'image/jpeg'
-        elif format == 'tiff':
-            ext = '.tiff'
-            filename += '.tiff'
-            mimetype = 'image/tiff'
-        elif format == 'webp':
-            ext = '.webp'
-            filename += '.webp'
-            encode_params = [cv2.IMWRITE_WEBP_QUALITY, max(1, min(100, quality))]
-            mimetype = 'image/webp'
-        else:  # PNG par défaut
-            ext = '.png'
-            filename += '.png'
-            mimetype = 'image/png'
-        
-        # Encoder l'image
-        success, buffer = cv2.imencode(ext, image, encode_params)
-        
-        if not success:
-            return jsonify({'error': 'Échec de l\'encodage de l\'image'}), 500
-        
-        # Créer un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-            tmp_file.write(buffer.tobytes())
-            tmp_path = tmp_file.name
+    except Exception as e:
+        logger.exception("❌ Erreur téléchargement: %s", e)
+        return jsonify({'error': f'Erreur téléchargement: {str(e)}'}), 500
+
+def immutable_response(response, etag):
+    """En-têtes de cache d'une réponse adressée par son contenu."""
+    response.set_etag(etag)
+    # send_file ajoute no-cache : inutile pour un contenu immuable
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['RENDER_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+def check_step_result(name, image):
+    """Lève RecipeError si une étape ne laisse aucun pixel (recadrage hors de l'image...)."""
+    if image is None or image.size == 0:
+        raise RecipeError(f"{name}: résultat vide (paramètres hors de l'image)")
+
+def render_recipe(planes, steps, max_side):
+    """Applique une recette (liste d'opérations) à partir d'un original."""
+    # Sans opération en pixels absolus, la vignette est calculée d'abord
+    # (sur l'aperçu réduit mis en cache), sinon réduite à la fin
+    shrink_first = max_side and not any(name in FULL_RES_ONLY_OPERATIONS for name, _ in steps)
+    if shrink_first:
+        planes = planes.preview(max_side)
+    
+    image = planes.image
+    for index, (name, params) in enumerate(steps):
+        # Les plans du cache ne valent que pour la première étape
+        image = process_image(name, image, dict(params), None, planes if index == 0 else None)
+        check_step_result(name, image)
+        image = display_image(image)
+    
+    if max_side and not shrink_first:
+        h, w = image.shape[:2]
+        scale = max_side / max(h, w)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+    return image
+
+@app.route('/api/render/<image_id>', methods=['GET'])
+def render(image_id):
+    """
+    Rendu cacheable : GET /api/render/<image_id>?ops=op:clé=valeur|op2
+    (&format=png|jpg|webp, &quality=, &max_side= pour les vignettes).
+
+    L'ETag fort dérive de l'empreinte de l'image et de la recette
+    canonique ; un If-None-Match correspondant reçoit un 304 sans calcul.
+    """
+    try:
+        entry = original_images.lookup(image_id)
+        if entry is None:
+            return jsonify({'error': 'Image inconnue'}), 404
         
         try:
-            return send_file(
-                tmp_path,
-                mimetype=mimetype,
-                as_attachment=True,
-                download_name=filename
-            )
-        finally:
-            # Nettoyer le fichier temporaire après l'envoi
-            if os.path.exists(tmp_path):
-                try:
-                    os.unlink(tmp_path)
-                except:
-                    pass
+            steps = parse_recipe(request.args.get('ops', ''), OPERATIONS)
+        except RecipeError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        format = request.args.get('format', 'png').lower()
+        if format == 'jpeg':
+            format = 'jpg'
+        if format not in ('jpg', 'webp'):
+            format = 'png'
+        quality = max(1, min(100, request.args.get('quality', 90, type=int)))
+        max_side = max(0, request.args.get('max_side', 0, type=int))
+        
+        canonical = canonical_recipe(steps)
+        etag = render_etag(image_id, canonical, format,
+                           quality if format != 'png' else '', max_side)
+        
+        # Le client (ou un proxy) a déjà cette version
+        if request.if_none_match.contains(etag):
+            return immutable_response(Response(status=304), etag)
+        
+        encoded = encode_cache.get(('render', etag))
+        if encoded is None:
+            try:
+                with compute_scheduler.slot(PRIORITY_INTERACTIVE):
+                    planes = session_planes_for_entry(entry)
+                    image = render_recipe(planes, steps, max_side)
+                    encoded = encode_image(image, format, **download_encoding(format, quality, image))
+            except SchedulerBusy as e:
+                return busy_response(e)
+            except RecipeError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if encoded is None:
+                return jsonify({'error': 'Échec de l\'encodage de l\'image'}), 500
+            encode_cache.put(('render', etag), encoded)
+        
+        response = send_file(io.BytesIO(encoded), mimetype=MIMETYPES[format])
+        return immutable_response(response, etag)
         
     except Exception as e:
-        print(f"❌ Erreur téléchargement: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'error': f'Erreur téléchargement: {str(e)}'}), 500
+        logger.exception("❌ Erreur rendu: %s", e)
+        return jsonify({'error': f'Erreur rendu: {str(e)}'}), 500
+
+def tile_pyramid(entry, steps):
+    """
+    Pyramide servant une recette, et étapes restant à appliquer par tuile.
+
+    Une recette d'opérations pixel à pixel réutilise la pyramide de
+    l'original : seules les tuiles demandées sont traitées. Les autres
+    recettes sont rendues en pleine résolution une fois, puis réduites
+    niveau par niveau à la demande.
+    """
+    key, tile_steps = pyramid_key(entry, steps)
+    if tile_steps is steps:
+        pyramid = pyramid_cache.get_or_build(key, lambda: entry.image, shared_base=True)
+    else:
+        pyramid = pyramid_cache.get_or_build(
+            key, lambda: render_recipe(session_planes_for_entry(entry), steps, 0))
+    return pyramid, tile_steps
+
+def pyramid_key(entry, steps):
+    """Clé de la pyramide d'une recette et étapes appliquées par tuile."""
+    if all(name in TILE_LOCAL_OPERATIONS for name, _ in steps):
+        return (entry.digest, ''), steps
+    return (entry.digest, canonical_recipe(steps)), []
+
+def tile_request(image_id):
+    """Entrée, recette, format et qualité d'une requête de tuiles (ou réponse d'erreur)."""
+    entry = original_images.lookup(image_id)
+    if entry is None:
+        return None, (jsonify({'error': 'Image inconnue'}), 404)
+    try:
+        steps = parse_recipe(request.args.get('ops', ''), OPERATIONS)
+    except RecipeError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+    format = request.args.get('format', 'jpg').lower()
+    if format == 'jpeg':
+        format = 'jpg'
+    if format not in ('png', 'webp'):
+        format = 'jpg'
+    quality = max(1, min(100, request.args.get('quality', 85, type=int)))
+    return (entry, steps, format, quality if format != 'png' else ''), None
+
+@app.route('/api/tiles/<image_id>', methods=['GET'])
+def tile_descriptor(image_id):
+    """
+    Description Deep Zoom de la pyramide d'une image (et d'une recette
+    ?ops=) : dimensions, taille de tuile, nombre de niveaux.
+    """
+    try:
+        parsed, error = tile_request(image_id)
+        if error is not None:
+            return error
+        entry, steps, format, quality = parsed
+        try:
+            with compute_scheduler.slot(PRIORITY_INTERACTIVE):
+                pyramid, _ = tile_pyramid(entry, steps)
+        except SchedulerBusy as e:
+            return busy_response(e)
+        except RecipeError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = request.query_string.decode('utf-8')
+        return jsonify(dict(
+            pyramid.describe(),
+            format=format,
+            tile_url=f'/api/tiles/{image_id}/{{level}}/{{x}}/{{y}}' + (f'?{query}' if query else '')
+        ))
+    
+    except Exception as e:
+        logger.exception("❌ Erreur pyramide: %s", e)
+        return jsonify({'error': f'Erreur pyramide: {str(e)}'}), 500
+
+@app.route('/api/tiles/<image_id>/<int:level>/<int:x>/<int:y>', methods=['GET'])
+def tile(image_id, level, x, y):
+    """
+    Tuile (x, y) du niveau `level` (0 = 1×1 pixel, dernier = pleine
+    résolution), avec la recette ?ops= et le format ?format=jpg|png|webp.
+    Adressée par contenu : ETag fort et cache HTTP immuable.
+    """
+    try:
+        parsed, error = tile_request(image_id)
+        if error is not None:
+            return error
+        entry, steps, format, quality = parsed
+        canonical = canonical_recipe(steps)
+        etag = render_etag(image_id, canonical, 'tile', level, x, y, format, quality)
+        
+        if request.if_none_match.contains(etag):
+            return immutable_response(Response(status=304), etag)
+        
+        # Tuile déjà encodée : servie sans passer par l'ordonnanceur
+        key, tile_steps = pyramid_key(entry, steps)
+        variant = (canonical_recipe(tile_steps), format, quality)
+        pyramid = pyramid_cache.peek(key)
+        encoded = pyramid.get_tile(level, x, y, variant) if pyramid is not None else None
+        
+        if encoded is None:
+            try:
+                with compute_scheduler.slot(PRIORITY_INTERACTIVE):
+                    pyramid, tile_steps = tile_pyramid(entry, steps)
+                    if not pyramid.has_tile(level, x, y):
+                        return jsonify({'error': 'Tuile hors de la pyramide'}), 404
+                    
+                    image = pyramid.tile_image(level, x, y)
+                    for name, params in tile_steps:
+                        image = display_image(process_image(name, image, dict(params)))
+                    options = {'quality': quality} if format != 'png' else {}
+                    encoded = encode_image(image, format, **options)
+            except SchedulerBusy as e:
+                return busy_response(e)
+            except RecipeError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if encoded is None:
+                return jsonify({'error': 'Échec de l\'encodage de la tuile'}), 500
+            pyramid.put_tile(level, x, y, variant, encoded)
+            pyramid_cache.touch(key)
+        
+        response = send_file(io.BytesIO(encoded), mimetype=MIMETYPES[format])
+        return immutable_response(response, etag)
+    
+    except Exception as e:
+        logger.exception("❌ Erreur tuile: %s", e)
+        return jsonify({'error': f'Erreur tuile: {str(e)}'}), 500
 
 @app.route('/api/reset', methods=['POST'])
 def reset_to_original():
@@ -467,24 +1268,23 @@ def reset_to_original():
         data = request.json
         session_id = data.get('session_id')
         
-        if not session_id or session_id not in original_images:
+        entry = original_images.entry(session_id) if session_id else None
+        if entry is None:
             return jsonify({'error': 'Session invalide ou image originale non trouvée'}), 400
         
-        # Récupérer l'image originale
-        original_image = original_images[session_id]
-        
-        # Encoder en base64
-        _, buffer = cv2.imencode('.png', original_image)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Récupérer l'image originale (déjà encodée lors de l'upload)
+        original_image = entry.image
+        if entry.data_url is None:
+            entry.data_url = encode_data_url(original_image)
         
         return jsonify({
             'success': True,
-            'image': f'data:image/png;base64,{img_base64}',
+            'image': entry.data_url,
             'dimensions': f'{original_image.shape[1]} × {original_image.shape[0]}'
         })
         
     except Exception as e:
-        print(f"❌ Erreur réinitialisation: {str(e)}")
+        logger.exception("❌ Erreur réinitialisation: %s", e)
         return jsonify({'error': f'Erreur réinitialisation: {str(e)}'}), 500
 
 @app.route('/api/crop', methods=['POST'])
@@ -503,8 +1303,7 @@ def crop_image():
         if ',' in image_data:
             image_data = image_data.split(',')[1]
             
-        img_array = np.frombuffer(base64.b64decode(image_data), np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        image = decode_image(base64.b64decode(image_data))
         
         if image is None:
             return jsonify({'error': 'Échec du décodage de l\'image'}), 400
@@ -519,45 +1318,30 @@ def crop_image():
         # Recadrer
         cropped = image[y:y+height, x:x+width]
         
-        # Encoder
-        _, buffer = cv2.imencode('.png', cropped)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
-        
         return jsonify({
             'success': True,
-            'image': f'data:image/png;base64,{img_base64}',
+            'image': encode_data_url(cropped),
             'dimensions': f'{cropped.shape[1]} × {cropped.shape[0]}'
         })
         
     except Exception as e:
-        print(f"❌ Erreur recadrage: {str(e)}")
+        logger.exception("❌ Erreur recadrage: %s", e)
         return jsonify({'error': f'Erreur recadrage: {str(e)}'}), 500
 
 @app.route('/api/cleanup', methods=['POST'])
 def cleanup_sessions():
     """Nettoyer les sessions anciennes"""
     try:
-        current_time = time.time()
-        sessions_to_remove = []
-        
-        for session_id, session_info in session_data.items():
-            if current_time - session_info['upload_time'] > 3600:  # 1 heure
-                sessions_to_remove.append(session_id)
-        
-        for session_id in sessions_to_remove:
-            if session_id in original_images:
-                del original_images[session_id]
-            if session_id in session_data:
-                del session_data[session_id]
+        cleaned = expire_sessions()
         
         return jsonify({
             'success': True,
-            'cleaned': len(sessions_to_remove),
+            'cleaned': cleaned,
             'remaining': len(session_data)
         })
         
     except Exception as e:
-        print(f"❌ Erreur nettoyage sessions: {str(e)}")
+        logger.exception("❌ Erreur nettoyage sessions: %s", e)
         return jsonify({'error': f'Erreur nettoyage: {str(e)}'}), 500
 
 @app.errorhandler(404)
@@ -568,12 +1352,42 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+def start_services():
+    """
+    Démarre ce qui ne concerne que le processus qui sert les requêtes :
+    rechargement des sessions, préchauffage, pool de processus et
+    expiration des sessions. Ni les workers du pool (qui réexécutent ce
+    module au démarrage « spawn ») ni le processus parent du reloader
+    (qui ne sert aucune requête) ne l'appellent.
+    """
+    if readiness.started:
+        return
+    if HAS_MODULES:
+        log_event(logger, "✓ Modules image chargés", module=PROCESSING_MODULE)
+    else:
+        log_event(logger, "⚠ Mode démo", logging.WARNING, module=PROCESSING_MODULE,
+                  operations=len(OPERATIONS), error=str(MODULES_ERROR))
+    if session_persistence is not None:
+        restore_sessions()
+        session_persistence.start()
+    readiness.start(process_image, OPERATIONS,
+                    benchmark_codecs=app.config['CODEC_BENCHMARK'] and not codec_registry.forced)
+    process_backend.start()
+
+# Fin du chargement du module : le préchauffage démarre en arrière-plan
+readiness.mark_imported()
+# Module importé par un serveur WSGI ou un script ; lancé directement, voir
+# plus bas (reloader)
+if __name__ != '__main__' and not in_worker_process():
+    start_services()
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 ImageLab Pro - Démarrage du serveur")
     print("=" * 60)
     print(f"📁 Répertoire: {current_dir}")
-    print(f"🔧 Modules: {'✓ Chargés' if HAS_MODULES else '⚠ Mode démo'}")
+    print(f"🔧 Modules: {'✓ Chargés' if HAS_MODULES else '⚠ Mode démo'} ({PROCESSING_MODULE})")
+    print(f"⏱  Import: {readiness.imported_at - STARTUP_STARTED:.2f}s, préchauffage en cours (/api/ready)")
     print(f"💾 Dossier temporaire: {app.config['UPLOAD_FOLDER']}")
     print(f"🌐 URL: http://localhost:5000")
     print(f"📅 Heure: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -582,104 +1396,15 @@ if __name__ == '__main__':
     # Nettoyer au démarrage
     cleanup_old_files()
     
+    # Avec le reloader (debug), le processus parent ne fait que surveiller
+    # les fichiers : seul l'enfant (WERKZEUG_RUN_MAIN) sert les requêtes
+    debug = True
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
+    
     app.run(
-        debug=True, 
+        debug=debug, 
         port=5000, 
         threaded=True,
         host='0.0.0.0'
     )
-@app.route('/api/histogram', methods=['POST'])
-def get_histogram():
-    try:
-        data = request.json
-        image_data = data.get('image')
-        channel = data.get('channel', 'rgb')
-        
-        if not image_data:
-            return jsonify({'error': 'Aucune donnée image'}), 400
-            
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
-        # Décoder l'image
-        img_array = np.frombuffer(base64.b64decode(image_data), np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return jsonify({'error': 'Échec du décodage de l\'image'}), 400
-        
-        # Calculer l'histogramme selon le canal demandé
-        hist_data = {}
-        
-        if channel == 'rgb' and len(image.shape) == 3:
-            # Histogramme pour chaque canal couleur
-            colors = ('blue', 'green', 'red')
-            for i, col in enumerate(colors):
-                hist = cv2.calcHist([image], [i], None, [256], [0, 256])
-                hist_data[col] = hist.flatten().tolist()
-                
-                # Calculer des statistiques plus détaillées
-                hist_array = np.array(hist)
-                non_zero = hist_array[hist_array > 0]
-                
-        elif channel == 'gray':
-            # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-            hist_data['gray'] = hist.flatten().tolist()
-            
-        elif channel in ['red', 'green', 'blue'] and len(image.shape) == 3:
-            # Canal spécifique
-            channel_map = {'red': 2, 'green': 1, 'blue': 0}
-            idx = channel_map[channel]
-            hist = cv2.calcHist([image], [idx], None, [256], [0, 256])
-            hist_data[channel] = hist.flatten().tolist()
-        
-        # Calculer des statistiques détaillées
-        stats = {
-            'min': {},
-            'max': {},
-            'mean': {},
-            'std': {},
-            'median': {},
-            'mode': {},
-            'total_pixels': image.shape[0] * image.shape[1]
-        }
-        
-        for channel_name, hist in hist_data.items():
-            if hist:
-                hist_array = np.array(hist)
-                
-                # Valeurs de base
-                stats['min'][channel_name] = float(np.min(hist_array))
-                stats['max'][channel_name] = float(np.max(hist_array))
-                stats['mean'][channel_name] = float(np.mean(hist_array))
-                stats['std'][channel_name] = float(np.std(hist_array))
-                
-                # Médiane
-                cumulative_sum = np.cumsum(hist_array)
-                median_index = np.where(cumulative_sum >= cumulative_sum[-1] / 2)[0][0]
-                stats['median'][channel_name] = float(median_index)
-                
-                # Mode (valeur la plus fréquente)
-                mode_index = np.argmax(hist_array)
-                stats['mode'][channel_name] = float(mode_index)
-        
-        return jsonify({
-            'success': True,
-            'histogram': hist_data,
-            'channel': channel,
-            'stats': stats,
-            'image_info': {
-                'width': image.shape[1],
-                'height': image.shape[0],
-                'channels': image.shape[2] if len(image.shape) == 3 else 1,
-                'total_pixels': image.shape[0] * image.shape[1]
-            }
-        })
-        
-    except Exception as e:
-        print(f"❌ Erreur histogramme: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'error': f'Erreur histogramme: {str(e)}'}), 500
-    
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Traitements de démonstration, utilisés seulement si le contrôleur
+principal (controllers.preprocess_controller) ne peut pas être importé.
+Sous-ensemble des opérations, sans cache de plans ni tampons du pool.
+"""
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Opérations disponibles en mode démo
+OPERATIONS = ('grayscale', 'blur', 'brightness', 'contrast', 'rotate', 'flip',
+              'threshold', 'channel_split', 'edge_detection', 'histogram_equalization')
+
+def process_image(operation, image, params=None, original_image=None, planes=None, buffers=None):
+    logger.debug("Mode démo: %s", operation)
+    if params is None:
+        params = {}
+    
+    # Utiliser l'originale si disponible
+    working_image = original_image if original_image is not None else image
+    
+    if operation == 'grayscale':
+        gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    elif operation == 'blur':
+        return cv2.GaussianBlur(working_image, (5, 5), 0)
+    elif operation == 'brightness':
+        value = params.get('value', 0)
+        value = max(-100, min(100, value))
+        
+        if value > 0:
+            shadow = value
+            highlight = 255
+        else:
+            shadow = 0
+            highlight = 255 + value
+
+        alpha = (highlight - shadow) / 255
+        gamma = shadow
+        return cv2.addWeighted(working_image, alpha, working_image, 0, gamma)
+    elif operation == 'contrast':
+        value = params.get('value', 0)
+        f = 131 * (value + 127) / (127 * (131 - value))
+        alpha = f
+        gamma = 127 * (1 - f)
+        return cv2.addWeighted(working_image, alpha, working_image, 0, gamma)
+    elif operation == 'rotate':
+        angle = params.get('angle', 0)
+        (h, w) = working_image.shape[:2]
+        center = (w // 2, h // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        return cv2.warpAffine(working_image, M, (w, h))
+    elif operation == 'flip':
+        mode = params.get('mode', 'horizontal')
+        if mode == 'horizontal':
+            return cv2.flip(working_image, 1)
+        else:
+            return cv2.flip(working_image, 0)
+    elif operation == 'threshold':
+        gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
+        thresh_type = params.get('type', 'binary')
+        value = params.get('value', 127)
+        
+        if thresh_type == 'otsu':
+            _, result = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        elif thresh_type == 'adaptive':
+            result = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
+        else:
+            _, result = cv2.threshold(gray, value, 255, cv2.THRESH_BINARY)
+        
+        return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+    elif operation == 'channel_split':
+        channel = params.get('channel', 'red')
+        b, g, r = cv2.split(working_image)
+        
+        if channel == 'red':
+            return cv2.merge([np.zeros_like(b), np.zeros_like(g), r])
+        elif channel == 'green':
+            return cv2.merge([np.zeros_like(b), g, np.zeros_like(r)])
+        elif channel == 'blue':
+            return cv2.merge([b, np.zeros_like(g), np.zeros_like(r)])
+        else:
+            return working_image
+    elif operation == 'edge_detection':
+        detector = params.get('detector', 'canny')
+        low = params.get('low', 50)
+        high = params.get('high', 150)
+        
+        gray = cv2.cvtColor(working_image, cv2.COLOR_BGR2GRAY)
+        
+        if detector == 'canny':
+            edges = cv2.Canny(gray, low, high)
+            return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+        elif detector == 'sobel':
+            sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+            sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+            magnitude = cv2.magnitude(sobelx, sobely)
+            magnitude = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+            return cv2.cvtColor(magnitude, cv2.COLOR_GRAY2BGR)
+        elif detector == 'laplacian':
+            laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+            laplacian = cv2.normalize(laplacian, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+            return cv2.cvtColor(laplacian, cv2.COLOR_GRAY2BGR)
+        else:
+            edges = cv2.Canny(gray, low, high)
+            return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+    elif operation == 'histogram_equalization':
+        # Égalisation d'histogramme sur l'image en couleur
+        if len(working_image.shape) == 2:
+            return cv2.equalizeHist(working_image)
+        else:
+            ycrcb = cv2.cvtColor(working_image, cv2.COLOR_BGR2YCrCb)
+            ycrcb[:,:,0] = cv2.equalizeHist(ycrcb[:,:,0])
+            return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+    
+    return working_image
@@ -1,23 +1,56 @@
+import logging
+
 import cv2
 import numpy as np
 from models.image_model import *
 
-def process_image(operation, image, params=None, original_image=None):
+logger = logging.getLogger(__name__)
+
+# Opérations reconnues par process_image
+OPERATIONS = (
+    'grayscale', 'resize', 'blur', 'brightness', 'contrast', 'rotate', 'flip',
+    'crop', 'threshold', 'channel_split', 'equalize', 'edge_detection',
+    'histogram_equalization'
+)
+
+def _gray_plane(working_image, planes):
+    """Plan de luminance : celui du cache si disponible, sinon converti."""
+    if planes is not None:
+        return planes.gray
+    return convert_to_grayscale(working_image)
+
+def _buffer(buffers, name, shape, dtype=np.uint8):
+    """Tampon de sortie emprunté au pool, ou None (allocation par OpenCV)."""
+    if buffers is None:
+        return None
+    return buffers.get(name, shape, dtype)
+
+def process_image(operation, image, params=None, original_image=None, planes=None, buffers=None):
     """
     Process image based on operation type
+
+    `planes` (DerivedPlanes, optionnel) fournit les plans dérivés déjà
+    calculés pour `working_image` : gris, YCrCb et gradients de Sobel.
+    `buffers` (BufferSet, optionnel) fournit les tampons de sortie : le
+    résultat peut alors être un tampon du pool, à encoder ou copier avant
+    de rendre le bail.
     """
     if params is None:
         params = {}
     
     try:
-        print(f"Traitement: {operation} avec params: {params}")
+        # Chemin chaud : rien n'est formaté si DEBUG est désactivé
+        logger.debug("Traitement: %s avec params: %s", operation, params)
         
         # Pour les réglages, utiliser l'image originale si fournie
         working_image = original_image if original_image is not None else image
+        shape = working_image.shape
+        gray_shape = shape[:2]
+        bgr_shape = gray_shape + (3,)
         
         if operation == 'grayscale':
-            gray = convert_to_grayscale(working_image)
-            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+            gray = _gray_plane(working_image, planes)
+            return gray_to_bgr(gray, _buffer(buffers, 'out', bgr_shape))
         
         elif operation == 'resize':
             width = params.get('width', working_image.shape[1])
@@ -25,7 +58,8 @@ def process_image(operation, image, params=None, original_image=None):
             # Protection contre les valeurs nulles ou négatives
             width = max(10, int(width))
             height = max(10, int(height))
-            return resize_image(working_image, width, height)
+            return resize_image(working_image, width, height,
+                                _buffer(buffers, 'out', (height, width) + shape[2:]))
         
         elif operation == 'blur':
             method = params.get('method', 'gaussian')
@@ -34,25 +68,28 @@ def process_image(operation, image, params=None, original_image=None):
             if kernel_size % 2 == 0:
                 kernel_size += 1
             kernel_size = max(3, min(kernel_size, 31))  # Limite
-            return apply_blur(working_image, method, kernel_size)
+            return apply_blur(working_image, method, kernel_size,
+                              dst=_buffer(buffers, 'out', shape))
         
         elif operation == 'brightness':
             value = params.get('value', 0)
             value = max(-100, min(100, value))  # Limite
-            return adjust_brightness(working_image, value)
+            return adjust_brightness(working_image, value, _buffer(buffers, 'out', shape))
         
         elif operation == 'contrast':
             value = params.get('value', 0)
             value = max(-100, min(100, value))  # Limite
-            return adjust_contrast(working_image, value)
+            return adjust_contrast(working_image, value, _buffer(buffers, 'out', shape))
         
         elif operation == 'rotate':
             angle = params.get('angle', 0)
-            return rotate_image(working_image, angle)
+            new_w, new_h = rotated_size(working_image, angle)
+            return rotate_image(working_image, angle,
+                                _buffer(buffers, 'out', (new_h, new_w) + shape[2:]))
         
         elif operation == 'flip':
             mode = params.get('mode', 'horizontal')
-            return flip_image(working_image, mode)
+            return flip_image(working_image, mode, _buffer(buffers, 'out', shape))
         
         elif operation == 'crop':
             x1 = params.get('x', 0)
@@ -70,81 +107,83 @@ def process_image(operation, image, params=None, original_image=None):
             value = max(0, min(255, value))  # Limite
     
     # First convert to grayscale
-            gray = convert_to_grayscale(working_image)
+            gray = _gray_plane(working_image, planes)
+            gray_out = _buffer(buffers, 'gray_out', gray_shape)
     
             if threshold_type == 'binary':
-                result = binary_threshold(gray, value)
+                result = binary_threshold(gray, value, gray_out)
             elif threshold_type == 'adaptive':
-                result = adaptive_threshold(gray)
+                result = adaptive_threshold(gray, gray_out)
             elif threshold_type == 'mean':
-                result = mean_based_threshold(gray)
+                result = mean_based_threshold(gray, gray_out)
             elif threshold_type == 'otsu':
-                result = otsu_threshold(gray)
+                result = otsu_threshold(gray, gray_out)
             else:
-                result = binary_threshold(gray, value)
+                result = binary_threshold(gray, value, gray_out)
     
     # Convertir en BGR pour l'affichage
-            return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+            return gray_to_bgr(result, _buffer(buffers, 'out', bgr_shape))
         elif operation == 'channel_split':
             channel = params.get('channel', 'red')
-            b, g, r = split_rgb_channels(working_image)
-            
-            if channel == 'red':
-                return cv2.merge([np.zeros_like(b), np.zeros_like(g), r])
-            elif channel == 'green':
-                return cv2.merge([np.zeros_like(b), g, np.zeros_like(r)])
-            elif channel == 'blue':
-                return cv2.merge([b, np.zeros_like(g), np.zeros_like(r)])
-            else:
-                return working_image
+            return isolate_channel(working_image, channel, _buffer(buffers, 'out', shape))
         
         elif operation == 'equalize':
-            gray = convert_to_grayscale(working_image)
-            equalized = equalize_histogram(gray)
-            return cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR)
+            gray = _gray_plane(working_image, planes)
+            equalized = equalize_histogram(gray, _buffer(buffers, 'gray_out', gray_shape))
+            return gray_to_bgr(equalized, _buffer(buffers, 'out', bgr_shape))
         
         elif operation == 'edge_detection':
             detector = params.get('detector', 'canny')
             low = params.get('low', 50)
             high = params.get('high', 150)
             
-            gray = convert_to_grayscale(working_image)
+            gray = _gray_plane(working_image, planes)
+            gray_out = _buffer(buffers, 'gray_out', gray_shape)
+            out = _buffer(buffers, 'out', bgr_shape)
             
-            if detector == 'canny':
-                edges = cv2.Canny(gray, low, high)
-                # Convertir en 3 canaux pour l'affichage
-                return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-            elif detector == 'sobel':
-                sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-                sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-                magnitude = cv2.magnitude(sobelx, sobely)
-                magnitude = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-                return cv2.cvtColor(magnitude, cv2.COLOR_GRAY2BGR)
+            if detector == 'sobel':
+                if planes is not None:
+                    sobelx, sobely = planes.sobel
+                else:
+                    sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+                    sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+                magnitude = cv2.magnitude(sobelx, sobely,
+                                          magnitude=_buffer(buffers, 'magnitude', gray_shape, np.float32))
+                magnitude = cv2.normalize(magnitude, gray_out, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+                return gray_to_bgr(magnitude, out)
             elif detector == 'laplacian':
-                laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-                laplacian = cv2.normalize(laplacian, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
-                return cv2.cvtColor(laplacian, cv2.COLOR_GRAY2BGR)
+                laplacian = cv2.Laplacian(gray, cv2.CV_64F,
+                                          dst=_buffer(buffers, 'laplacian', gray_shape, np.float64))
+                laplacian = cv2.normalize(laplacian, gray_out, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+                return gray_to_bgr(laplacian, out)
             else:
-                edges = cv2.Canny(gray, low, high)
-                return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+                # Canny (détecteur par défaut)
+                edges = cv2.Canny(gray, low, high, edges=gray_out)
+                # Convertir en 3 canaux pour l'affichage
+                return gray_to_bgr(edges, out)
         
         elif operation == 'histogram_equalization':
             # Égalisation d'histogramme sur l'image en couleur
             if len(working_image.shape) == 2:
                 # Image en niveaux de gris
-                return cv2.equalizeHist(working_image)
+                return cv2.equalizeHist(working_image, dst=_buffer(buffers, 'out', shape))
             else:
-                # Image couleur
-                ycrcb = cv2.cvtColor(working_image, cv2.COLOR_BGR2YCrCb)
-                ycrcb[:,:,0] = cv2.equalizeHist(ycrcb[:,:,0])
-                return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+                # Image couleur : égalisation en place de la luminance dans
+                # un tampon YCrCb (le plan du cache est en lecture seule)
+                ycrcb = _buffer(buffers, 'ycrcb', shape)
+                if planes is not None and ycrcb is not None:
+                    np.copyto(ycrcb, planes.ycrcb)
+                elif planes is not None:
+                    ycrcb = planes.ycrcb.copy()
+                else:
+                    ycrcb = cv2.cvtColor(working_image, cv2.COLOR_BGR2YCrCb, dst=ycrcb)
+                ycrcb[:,:,0] = cv2.equalizeHist(ycrcb[:,:,0], dst=_buffer(buffers, 'gray_out', gray_shape))
+                return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR, dst=_buffer(buffers, 'out', shape))
         
         else:
-            print(f"Opération non reconnue: {operation}")
+            logger.warning("Opération non reconnue: %s", operation)
             return working_image
     
     except Exception as e:
-        print(f"Erreur dans process_image: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erreur dans process_image (%s): %s", operation, e)
         return working_image if working_image is not None else image
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+Balayage d'un paramètre : une opération évaluée sur une série de valeurs
+en une seule requête, rendue en miniatures ou en planche contact.
+
+Toutes les valeurs partagent le même décodage et les mêmes plans dérivés
+(gris, gradients). Le seuillage binaire est vectorisé : une seule passe
+sur les pixels donne tous les niveaux. Canny réutilise les dérivées
+calculées une fois ; les autres opérations passent par process_image
+(fourni par l'appelant : contrôleur principal ou mode démo).
+"""
+import math
+
+import cv2
+import numpy as np
+
+# Hauteur du bandeau de légende sous chaque case de la planche
+LABEL_HEIGHT = 18
+SHEET_GAP = 4
+# Cases d'histogramme (blocs × niveaux) et pixels traités à la fois par
+# le balayage de seuil : quelques Mo de compteurs par bande
+HISTOGRAM_CHUNK_CELLS = 1 << 20
+
+
+class SweepError(ValueError):
+    """Balayage mal décrit (paramètre ou valeurs invalides)."""
+
+
+def sweep_values(spec, max_values):
+    """
+    Valeurs à évaluer : liste explicite (`values`) ou plage inclusive
+    (`range`: {start, stop, step}). Lève SweepError si la série est vide
+    ou trop longue.
+    """
+    if spec.get('values') is not None:
+        values = list(spec['values'])
+    elif spec.get('range') is not None:
+        bounds = spec['range']
+        try:
+            start, stop = float(bounds['start']), float(bounds['stop'])
+            step = float(bounds.get('step', 1))
+        except (KeyError, TypeError, ValueError):
+            raise SweepError("Plage invalide: start, stop et step numériques attendus")
+        if step <= 0 or stop < start:
+            raise SweepError("Plage invalide: step > 0 et stop >= start attendus")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        if count > max_values:
+            raise SweepError(f"Trop de valeurs ({count}, maximum {max_values})")
+        values = [start + i * step for i in range(count)]
+        # 10.0 et 10 désignent le même réglage
+        values = [int(v) if float(v).is_integer() else round(v, 6) for v in values]
+    else:
+        raise SweepError("Aucune valeur à balayer (values ou range)")
+    if not values:
+        raise SweepError("Aucune valeur à balayer")
+    if len(values) > max_values:
+        raise SweepError(f"Trop de valeurs ({len(values)}, maximum {max_values})")
+    return values
+
+
+def block_factor(shape, max_side):
+    """
+    Facteur de réduction entier : chaque miniature est une moyenne de
+    blocs k×k. Borné par le petit côté (miniature d'au moins 1×1).
+    """
+    return max(1, min(math.ceil(max(shape[:2]) / max_side), min(shape[:2])))
+
+
+def shrink(image, k):
+    """Réduction par moyenne de blocs k×k (bords incomplets ignorés)."""
+    if k == 1:
+        return image.copy()
+    height, width = image.shape[0] // k, image.shape[1] // k
+    cropped = image[:height * k, :width * k]
+    return cv2.resize(cropped, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def threshold_sweep(gray, levels, k):
+    """
+    Miniatures du seuillage binaire (pixel > niveau) pour tous les niveaux
+    en une passe : chaque pixel est classé d'après le nombre de niveaux
+    qu'il dépasse (table de 256 entrées), puis un histogramme par bloc
+    donne la proportion de pixels blancs de chaque bloc à chaque niveau.
+    Identique à la réduction INTER_AREA de chaque image seuillée.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    order = np.argsort(levels, kind='stable')
+    count = len(levels)
+    bins = count + 1
+    # Rang de chaque valeur de gris : nombre de niveaux strictement inférieurs
+    lut = np.searchsorted(levels[order], np.arange(256), side='left')
+
+    height, width = gray.shape[0] // k, gray.shape[1] // k
+    cropped = np.ascontiguousarray(gray[:height * k, :width * k])
+    if bins <= 256:
+        ranks = cv2.LUT(cropped, lut.astype(np.uint8))
+    else:
+        ranks = lut.astype(np.int32)[cropped]
+    ranks = ranks.reshape(height, k, width, k)
+
+    thumbs = np.empty((count, height, width), np.uint8)
+    # Histogrammes par bandes de lignes de miniature : la mémoire de
+    # travail reste bornée quels que soient la taille et le nombre de niveaux
+    rows = max(1, HISTOGRAM_CHUNK_CELLS // (width * max(bins, k * k)))
+    scale = np.float32(255.0 / (k * k))
+    for top in range(0, height, rows):
+        band = min(rows, height - top)
+        blocks = (np.arange(band, dtype=np.int32)[:, None, None, None] * width
+                  + np.arange(width, dtype=np.int32)[None, None, :, None]) * bins
+        histogram = np.bincount((blocks + ranks[top:top + band]).ravel(),
+                                minlength=band * width * bins).reshape(band * width, bins)
+        # Pixels au-dessus du niveau trié j : ceux de rang > j
+        below = np.cumsum(histogram[:, :count], axis=1)
+        above = (k * k - below).astype(np.float32)
+        above *= scale
+        levels_first = np.rint(above).astype(np.uint8).T.reshape(count, band, width)
+        thumbs[order, top:top + band] = levels_first
+    return list(thumbs)
+
+
+def canny_sweep(gray, pairs, k):
+    """
+    Miniatures de Canny pour chaque couple (bas, haut) : les dérivées de
+    Sobel (celles que cv2.Canny calcule sur l'image) ne sont calculées
+    qu'une fois.
+    """
+    dx = cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3, borderType=cv2.BORDER_REPLICATE)
+    dy = cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3, borderType=cv2.BORDER_REPLICATE)
+    edges = np.empty(gray.shape, np.uint8)
+    return [shrink(cv2.Canny(dx, dy, low, high, edges=edges), k) for low, high in pairs]
+
+
+def generic_sweep(process_image, operation, planes, params, param, values, k, buffers=None):
+    """Une exécution de process_image par valeur, sur les plans partagés."""
+    thumbs = []
+    for value in values:
+        result = process_image(operation, planes.image, dict(params, **{param: value}),
+                               None, planes, buffers)
+        if result is None:
+            result = planes.image
+        # Le résultat peut être un tampon du pool : réduit (copié) tout de suite
+        thumbs.append(shrink(result, k))
+    return thumbs
+
+
+def run_sweep(process_image, operation, planes, params, param, values, max_side, buffers=None):
+    """
+    Évalue `operation` pour chaque valeur de `param` (pour Canny,
+    `param='pairs'` et des couples [bas, haut]), avec `process_image` du
+    module de traitement actif quand aucune méthode dédiée ne s'applique.
+    Retourne les miniatures (plus grand côté <= `max_side`) et le nom de
+    la méthode utilisée.
+    """
+    k = block_factor(planes.image.shape, max_side)
+    if operation == 'threshold' and param == 'value' and params.get('type', 'binary') == 'binary':
+        levels = [max(0, min(255, v)) for v in values]
+        return threshold_sweep(planes.gray, levels, k), 'vectorized'
+
+    if operation == 'edge_detection' and params.get('detector', 'canny') == 'canny' \
+            and param in ('low', 'high', 'pairs'):
+        if param == 'pairs':
+            if not all(isinstance(pair, (list, tuple)) and len(pair) == 2 for pair in values):
+                raise SweepError("Couples [bas, haut] attendus pour Canny")
+            pairs = [(pair[0], pair[1]) for pair in values]
+        else:
+            pairs = [(v, params.get('high', 150)) if param == 'low' else (params.get('low', 50), v)
+                     for v in values]
+        return canny_sweep(planes.gray, pairs, k), 'shared_gradients'
+
+    return generic_sweep(process_image, operation, planes, params, param, values, k, buffers), 'per_value'
+
+
+def format_label(param, value):
+    if isinstance(value, (list, tuple)):
+        value = '/'.join(str(v) for v in value)
+    return f'{param}={value}'
+
+
+def contact_sheet(thumbs, labels, columns=None):
+    """
+    Assemble les miniatures en planche contact, chacune légendée.
+    Retourne l'image BGR et la position de chaque case (x, y, largeur,
+    hauteur de la miniature) pour relier un clic à sa valeur.
+    """
+    columns = columns or math.ceil(math.sqrt(len(thumbs)))
+    columns = max(1, min(columns, len(thumbs)))
+    rows = math.ceil(len(thumbs) / columns)
+    cell_w = max(t.shape[1] for t in thumbs)
+    cell_h = max(t.shape[0] for t in thumbs) + LABEL_HEIGHT
+    sheet = np.full((rows * cell_h + (rows + 1) * SHEET_GAP,
+                     columns * cell_w + (columns + 1) * SHEET_GAP, 3), 32, np.uint8)
+
+    cells = []
+    for i, (thumb, label) in enumerate(zip(thumbs, labels)):
+        row, column = divmod(i, columns)
+        x = SHEET_GAP + column * (cell_w + SHEET_GAP)
+        y = SHEET_GAP + row * (cell_h + SHEET_GAP)
+        h, w = thumb.shape[:2]
+        sheet[y:y + h, x:x + w] = thumb if thumb.ndim == 3 else thumb[:, :, None]
+        cv2.putText(sheet, label, (x + 2, y + h + LABEL_HEIGHT - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (230, 230, 230), 1, cv2.LINE_AA)
+        cells.append({'x': x, 'y': y, 'width': w, 'height': h})
+    return sheet, cells
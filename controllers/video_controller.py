@@ -0,0 +1,149 @@
+"""
+Traitement de vidéos et de séquences d'images image par image, avec les
+mêmes opérations que l'API (process_image).
+
+Les images sont lues dans l'ordre, traitées par lots en parallèle, puis
+écrites au fil de l'eau dans l'ordre d'origine. Le nombre de lots en vol
+est borné : la mémoire ne dépend pas de la longueur de la vidéo.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from controllers.preprocess_controller import process_image
+
+DEFAULT_FOURCC = {'.mp4': 'mp4v', '.avi': 'MJPG', '.mkv': 'XVID', '.mov': 'mp4v'}
+
+
+def is_sequence_pattern(path):
+    """Motif de séquence numérotée, ex. frames/img_%04d.png."""
+    return '%' in os.path.basename(path)
+
+
+def open_source(path):
+    """
+    Ouvre une vidéo ou une séquence numérotée (cv2.VideoCapture gère les
+    deux). Lève IOError si la source est illisible.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Source vidéo illisible: {path}")
+    return capture
+
+
+def apply_steps(frame, steps):
+    """Applique une recette [(opération, paramètres)] à une image."""
+    result = frame
+    for operation, params in steps:
+        result = process_image(operation, result, dict(params))
+    if len(result.shape) == 2:
+        result = cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+    return result
+
+
+def process_batch(frames, steps):
+    return [apply_steps(frame, steps) for frame in frames]
+
+
+class FrameWriter:
+    """
+    Sortie au fil de l'eau : fichier vidéo (VideoWriter ouvert à la
+    taille de la première image traitée) ou séquence numérotée.
+    """
+
+    def __init__(self, path, fps, fourcc=None):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc or DEFAULT_FOURCC.get(os.path.splitext(path)[1].lower(), 'mp4v')
+        self.count = 0
+        self._writer = None
+
+    def write(self, frame):
+        if is_sequence_pattern(self.path):
+            if not cv2.imwrite(self.path % self.count, frame):
+                raise IOError(f"Écriture impossible: {self.path % self.count}")
+        else:
+            if self._writer is None:
+                height, width = frame.shape[:2]
+                self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                               self.fps, (width, height))
+                if not self._writer.isOpened():
+                    raise IOError(f"Écriture vidéo impossible: {self.path} ({self.fourcc})")
+            self._writer.write(frame)
+        self.count += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+def process_video(source, output, steps, workers=None, batch_size=8,
+                  max_pending=None, fourcc=None, fps=None, progress=None,
+                  progress_interval=2.0):
+    """
+    Traite `source` (vidéo ou séquence) avec la recette `steps` et écrit
+    le résultat dans `output`.
+
+    `workers` threads traitent des lots de `batch_size` images ; au plus
+    `max_pending` lots (par défaut 2 par worker) sont en mémoire. Si
+    `progress` est fourni, il est appelé avec les statistiques courantes
+    toutes les `progress_interval` secondes. Retourne les statistiques
+    finales (images, durée, images/s).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    capture = open_source(source)
+    source_fps = capture.get(cv2.CAP_PROP_FPS)
+    writer = FrameWriter(output, fps or source_fps or 25, fourcc)
+
+    stats = {'frames_read': 0, 'frames_written': 0}
+    started = time.perf_counter()
+    last_report = started
+    pending = deque()
+
+    def update():
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['fps'] = round(stats['frames_written'] / elapsed, 2) if elapsed > 0 else 0.0
+        return stats
+
+    def write_next():
+        nonlocal last_report
+        for frame in pending.popleft().result():
+            writer.write(frame)
+            stats['frames_written'] += 1
+        if progress is not None and time.perf_counter() - last_report >= progress_interval:
+            last_report = time.perf_counter()
+            progress(update())
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = []
+                while len(batch) < batch_size:
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    batch.append(frame)
+                if not batch:
+                    break
+                stats['frames_read'] += len(batch)
+                pending.append(pool.submit(process_batch, batch, steps))
+
+                # Écrire ce qui est prêt en tête, bloquer seulement si la file est pleine
+                while pending and (len(pending) >= max_pending or pending[0].done()):
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        for future in pending:
+            future.cancel()
+        capture.release()
+        writer.close()
+
+    stats.update({'source_fps': source_fps, 'workers': workers, 'batch_size': batch_size})
+    return update()
@@ -0,0 +1,435 @@
+"""
+Test de charge et d'endurance de l'API ImageLab Pro.
+
+Démarre l'application localement (ou vise --url), puis rejoue des
+sessions réalistes avec N utilisateurs simultanés :
+upload, rafales de /api/process pilotées par un curseur, /api/histogram,
+puis téléchargement. Rapporte débit, percentiles de latence, taux
+d'erreurs et évolution de la mémoire (RSS) du serveur, et signale les
+régressions par rapport à une référence enregistrée.
+
+Exemples :
+    python load_test.py --users 8 --duration 60
+    python load_test.py --users 4 --duration 3600 --save-baseline baseline.json
+    python load_test.py --users 4 --duration 300 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Opérations pilotées par un curseur : (opération, paramètre, plage)
+SLIDER_OPERATIONS = (
+    ('brightness', 'value', (-100, 100)),
+    ('contrast', 'value', (-100, 100)),
+    ('rotate', 'angle', (-180, 180)),
+    ('blur', 'kernel_size', (3, 31)),
+)
+
+
+# ---------------------------------------------------------------- client HTTP
+
+class Recorder:
+    """Latences et statuts de toutes les requêtes, par endpoint."""
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append((status, seconds))
+
+    def summary(self, elapsed):
+        with self._lock:
+            samples = {k: list(v) for k, v in self._samples.items()}
+        endpoints = {}
+        for endpoint, values in sorted(samples.items()):
+            endpoints[endpoint] = summarize(values, elapsed)
+        everything = [v for values in samples.values() for v in values]
+        return {'total': summarize(everything, elapsed), 'endpoints': endpoints}
+
+
+def summarize(values, elapsed):
+    """Débit, percentiles (ms) et répartition des statuts d'une série."""
+    if not values:
+        return {'requests': 0}
+    latencies = np.array([seconds for _, seconds in values]) * 1000
+    statuses = {}
+    for status, _ in values:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    # 409 (requête dépassée) et 503 (file pleine) sont des refus voulus
+    errors = sum(n for s, n in statuses.items() if s not in ('200', '202', '304', '409', '503'))
+    return {
+        'requests': len(values),
+        'throughput': round(len(values) / elapsed, 2),
+        'latency_ms': dict({f'p{p}': round(float(np.percentile(latencies, p)), 2) for p in PERCENTILES},
+                           max=round(float(latencies.max()), 2)),
+        'statuses': statuses,
+        'error_rate': round(errors / len(values), 4),
+        'shed_rate': round((statuses.get('409', 0) + statuses.get('503', 0)) / len(values), 4)
+    }
+
+
+def call(base_url, recorder, endpoint, payload=None, body=None, headers=None, timeout=60):
+    """Requête HTTP enregistrée ; retourne (statut, JSON ou octets)."""
+    headers = dict(headers or {})
+    if payload is not None:
+        body = json.dumps(payload).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    req = urllib.request.Request(base_url + endpoint, data=body, headers=headers,
+                                 method='POST' if body is not None else 'GET')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            status, data = response.status, response.read()
+            content_type = response.headers.get('Content-Type', '')
+    except urllib.error.HTTPError as e:
+        status, data, content_type = e.code, e.read(), e.headers.get('Content-Type', '')
+    except (urllib.error.URLError, OSError):
+        status, data, content_type = 'network', b'', ''
+    recorder.record(endpoint.split('?')[0], status, time.perf_counter() - started)
+    if content_type.startswith('application/json'):
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            pass
+    return status, data
+
+
+def multipart(field, filename, content, mimetype):
+    """Corps multipart/form-data d'un seul fichier."""
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {mimetype}\r\n\r\n').encode('utf-8') + content + \
+           f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+# ------------------------------------------------------------------- sessions
+
+def session_image(args, rng):
+    """
+    Image JPEG d'une session. Chaque session a des pixels différents :
+    sinon l'upload est dédupliqué et la mémoire par session n'est pas mesurée.
+    """
+    if args.image:
+        image = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        image[0, 0] = rng.integers(0, 256, 3)
+    else:
+        width, height = args.image_size
+        image = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+    _, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def run_session(args, base_url, recorder, rng, pool):
+    """Une session utilisateur complète."""
+    body, headers = multipart('image', 'load.jpg', session_image(args, rng), 'image/jpeg')
+    status, upload = call(base_url, recorder, '/api/upload', body=body, headers=headers)
+    if status != 200 or not isinstance(upload, dict):
+        return
+    image = upload['image']
+    session_id = upload['session_id']
+    client_session = uuid.uuid4().hex
+    seq = 0
+
+    for _ in range(args.bursts):
+        operation, key, (low, high) = SLIDER_OPERATIONS[rng.integers(len(SLIDER_OPERATIONS))]
+        pending = []
+        for value in np.linspace(low, high, args.burst_size).astype(int):
+            seq += 1
+            pending.append(pool.submit(call, base_url, recorder, '/api/process', {
+                'operation': operation, 'params': {key: int(value)}, 'image': image,
+                'session_id': session_id, 'client_session': client_session, 'seq': seq
+            }))
+            time.sleep(args.slider_interval)
+        for future in pending:
+            future.result()
+
+        seq += 1
+        call(base_url, recorder, '/api/histogram', {
+            'image': image, 'channel': 'rgb', 'client_session': client_session, 'seq': seq
+        })
+        time.sleep(args.think_time)
+
+    call(base_url, recorder, '/api/download', {
+        'image': image, 'format': str(rng.choice(['png', 'jpg', 'webp'])), 'quality': 90
+    })
+
+
+def user_loop(args, base_url, recorder, deadline, user_index, counter):
+    rng = np.random.default_rng(args.seed + user_index)
+    # Curseur : quelques requêtes se chevauchent, comme dans le client web
+    with ThreadPoolExecutor(max_workers=args.inflight) as pool:
+        while time.time() < deadline:
+            if args.sessions and counter.next() > args.sessions:
+                break
+            run_session(args, base_url, recorder, rng, pool)
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+# ---------------------------------------------------------------- mémoire
+
+def read_rss(pid):
+    """RSS du processus en octets (Linux), None si indisponible."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Relève périodiquement la RSS du serveur et les stats de /api/health."""
+
+    def __init__(self, base_url, pid, interval):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._halt = threading.Event()
+        self._began = time.time()
+
+    def run(self):
+        while not self._halt.is_set():
+            sample = {'t': round(time.time() - self._began, 1)}
+            if self.pid is not None:
+                sample['rss'] = read_rss(self.pid)
+            try:
+                with urllib.request.urlopen(self.base_url + '/api/health', timeout=5) as response:
+                    health = json.loads(response.read())
+                sample['originals'] = health.get('originals')
+            except (urllib.error.URLError, OSError, ValueError):
+                pass
+            self.samples.append(sample)
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def summary(self):
+        rss = [(s['t'], s['rss']) for s in self.samples if s.get('rss')]
+        report = {'samples': self.samples}
+        if len(rss) >= 2:
+            t, values = np.array(rss, dtype=np.float64).T
+            slope = np.polyfit(t, values, 1)[0] if t[-1] > t[0] else 0.0
+            report.update({
+                'rss_start_mb': round(values[0] / 2**20, 1),
+                'rss_peak_mb': round(values.max() / 2**20, 1),
+                'rss_end_mb': round(values[-1] / 2**20, 1),
+                'rss_growth_mb': round((values[-1] - values[0]) / 2**20, 1),
+                # Pente moyenne : une croissance continue en endurance signale une fuite
+                'rss_slope_mb_per_min': round(slope * 60 / 2**20, 2)
+            })
+        originals = [s['originals'] for s in self.samples if s.get('originals')]
+        if originals:
+            report['originals_end'] = originals[-1]
+        return report
+
+
+# ---------------------------------------------------------------- serveur
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout):
+    """
+    Démarre l'application (sans reloader) et attend /api/ready. Sans
+    sauvegarde des sessions : le test n'écrit rien dans temp_uploads et
+    ne recharge pas les sessions d'un serveur de développement.
+    """
+    code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    env = dict(os.environ, SESSION_PERSISTENCE='0')
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=current_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {process.returncode})")
+        try:
+            with urllib.request.urlopen(base_url + '/api/ready', timeout=2) as response:
+                if response.status == 200:
+                    return process, base_url
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Le serveur n'est pas prêt à temps")
+
+
+# ---------------------------------------------------------------- référence
+
+def compare_baseline(report, baseline, tolerance):
+    """Liste des régressions par rapport à la référence."""
+    regressions = []
+    current, reference = report['requests'], baseline['requests']
+
+    def check(label, value, limit, worse_if_higher=True):
+        if value is None or limit is None:
+            return
+        if (value > limit) if worse_if_higher else (value < limit):
+            regressions.append(f'{label}: {value} (limite {round(limit, 2)})')
+
+    endpoints = set(current['endpoints']) & set(reference['endpoints'])
+    for endpoint in sorted(endpoints) + ['total']:
+        cur = current['total'] if endpoint == 'total' else current['endpoints'][endpoint]
+        ref = reference['total'] if endpoint == 'total' else reference['endpoints'][endpoint]
+        if not cur.get('requests') or not ref.get('requests'):
+            continue
+        for p in ('p95', 'p99'):
+            check(f'{endpoint} {p}', cur['latency_ms'][p], ref['latency_ms'][p] * (1 + tolerance))
+        check(f'{endpoint} erreurs', cur['error_rate'], ref['error_rate'] + 0.01)
+    check('débit total', current['total'].get('throughput'),
+          reference['total'].get('throughput', 0) * (1 - tolerance), worse_if_higher=False)
+
+    cur_slope = report['memory'].get('rss_slope_mb_per_min')
+    ref_slope = baseline['memory'].get('rss_slope_mb_per_min')
+    if cur_slope is not None and ref_slope is not None:
+        # Marge absolue : une pente de référence proche de zéro reste comparable
+        check('pente RSS (Mo/min)', cur_slope, max(ref_slope, 0) * (1 + tolerance) + 1)
+    return regressions
+
+
+def print_report(report):
+    total = report['requests']['total']
+    print("=" * 60)
+    print(f"📊 {total.get('requests', 0)} requêtes en {report['elapsed']:.1f}s "
+          f"({total.get('throughput', 0)} req/s, {report['config']['users']} utilisateurs)")
+    print("=" * 60)
+    for endpoint, stats in report['requests']['endpoints'].items():
+        lat = stats['latency_ms']
+        print(f"{endpoint:<16} {stats['requests']:>6} req  p50 {lat['p50']:>7.1f}  "
+              f"p95 {lat['p95']:>7.1f}  p99 {lat['p99']:>7.1f}  max {lat['max']:>7.1f} ms  "
+              f"erreurs {stats['error_rate']:.2%}  refus {stats['shed_rate']:.2%}")
+    memory = report['memory']
+    if 'rss_start_mb' in memory:
+        print(f"💾 RSS: {memory['rss_start_mb']} → {memory['rss_end_mb']} Mo "
+              f"(pic {memory['rss_peak_mb']}, {memory['rss_slope_mb_per_min']:+} Mo/min)")
+    if 'originals_end' in memory:
+        print(f"🖼  Originaux en fin de test: {memory['originals_end']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de l'API ImageLab Pro")
+    parser.add_argument('--url', help="Serveur déjà démarré (sinon l'application est lancée localement)")
+    parser.add_argument('--pid', type=int, help="PID du serveur visé par --url, pour la RSS")
+    parser.add_argument('--users', type=int, default=4, help='Utilisateurs simultanés')
+    parser.add_argument('--duration', type=float, default=30, help='Durée en secondes')
+    parser.add_argument('--sessions', type=int, default=0, help='Nombre total de sessions (0 = selon la durée)')
+    parser.add_argument('--bursts', type=int, default=3, help='Rafales de curseur par session')
+    parser.add_argument('--burst-size', type=int, default=10, help='Requêtes par rafale')
+    parser.add_argument('--slider-interval', type=float, default=0.03, help='Intervalle entre deux valeurs du curseur (s)')
+    parser.add_argument('--inflight', type=int, default=2, help='Requêtes de curseur simultanées par utilisateur')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Pause entre deux rafales (s)')
+    parser.add_argument('--image', help='Image à uploader (sinon image synthétique)')
+    parser.add_argument('--image-size', type=int, nargs=2, default=(1280, 960), metavar=('W', 'H'))
+    parser.add_argument('--sample-interval', type=float, default=2, help='Intervalle des relevés mémoire (s)')
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Rapport JSON complet')
+    parser.add_argument('--save-baseline', help='Enregistre ce rapport comme référence')
+    parser.add_argument('--baseline', help='Compare à une référence et échoue en cas de régression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Dégradation relative tolérée')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    process = None
+    if args.url:
+        base_url, pid = args.url.rstrip('/'), args.pid
+    else:
+        print("🚀 Démarrage du serveur...")
+        process, base_url = start_server(free_port(), args.startup_timeout)
+        pid = process.pid
+
+    recorder = Recorder()
+    sampler = MemorySampler(base_url, pid, args.sample_interval)
+    sampler.start()
+    counter = Counter()
+    print(f"🔥 {args.users} utilisateurs pendant {args.duration:.0f}s sur {base_url}")
+
+    started = time.time()
+    deadline = started + args.duration
+    try:
+        threads = [threading.Thread(target=user_loop,
+                                    args=(args, base_url, recorder, deadline, i, counter))
+                   for i in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - started
+        sampler.stop()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        'config': {k: v for k, v in vars(args).items()
+                   if k not in ('output', 'save_baseline', 'baseline')},
+        'elapsed': round(elapsed, 2),
+        'requests': recorder.summary(elapsed),
+        'memory': sampler.summary()
+    }
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"✓ Rapport enregistré: {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) par rapport à {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(f"✅ Aucune régression par rapport à {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import functools
+import math
+
+import cv2
+import numpy as np
+
+# Canaux BGR d'OpenCV
+CHANNEL_INDEX = {'blue': 0, 'green': 1, 'red': 2}
+
+PERCENTILES = (1, 5, 25, 75, 95, 99)
+
+
+# Graine fixe : un même fichier donne toujours le même histogramme
+SAMPLE_SEED = 0
+
+
+def sample_count(pixel_count, target_samples):
+    """Nombre de pixels à tirer ; `pixel_count` = histogramme exact."""
+    return min(pixel_count, target_samples)
+
+
+@functools.lru_cache(maxsize=4)
+def sample_indices(pixel_count, count, seed=SAMPLE_SEED):
+    """
+    Indices (aplatis) de `count` pixels tirés uniformément avec remise :
+    des tirages i.i.d., ce que suppose la borne DKW. Un pas régulier
+    se replierait sur les motifs périodiques (trames, textures). Triés
+    pour parcourir l'image dans l'ordre de la mémoire.
+    """
+    indices = np.random.default_rng(seed).integers(0, pixel_count, size=count)
+    indices.sort()
+    indices.flags.writeable = False
+    return indices
+
+
+def sample_plane(image, indices):
+    """
+    Pixels tirés d'un plan, sous forme d'une image d'une colonne
+    (acceptée par calcHist). Sans indices, le plan entier.
+    """
+    if indices is None:
+        return image
+    channels = image.shape[2:]
+    pixels = image.reshape((-1,) + channels)[indices]
+    return pixels.reshape((len(indices), 1) + channels)
+
+
+def sampling_error_bound(sample_count, confidence=0.95):
+    """
+    Borne d'erreur (DKW) sur la fonction de répartition estimée à partir
+    de `sample_count` pixels : avec la probabilité `confidence`, chaque
+    percentile est exact à ±epsilon en rang relatif.
+    """
+    alpha = 1 - confidence
+    return math.sqrt(math.log(2 / alpha) / (2 * sample_count))
+
+
+def channel_histogram(image, channel_index=0):
+    """Histogramme 256 niveaux d'un canal (float64, comptes de pixels)."""
+    hist = cv2.calcHist([image], [channel_index], None, [256], [0, 256])
+    return hist.ravel().astype(np.float64)
+
+
+def hue_saturation_histogram(image_hsv, hue_bins=30, saturation_bins=32):
+    """Histogramme 2-D teinte/saturation en une seule passe."""
+    hist = cv2.calcHist([image_hsv], [0, 1], None,
+                        [hue_bins, saturation_bins], [0, 180, 0, 256])
+    return hist.astype(np.float64)
+
+
+def histogram_stats(hist):
+    """
+    Statistiques des valeurs de pixels calculées directement depuis les
+    256 classes de l'histogramme, en O(256).
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if total <= 0:
+        return None
+
+    levels = np.arange(hist.size, dtype=np.float64)
+    mean = float((levels * hist).sum() / total)
+    variance = float((((levels - mean) ** 2) * hist).sum() / total)
+    non_zero = np.flatnonzero(hist)
+    cdf = np.cumsum(hist) / total
+
+    def percentile(p):
+        return float(np.searchsorted(cdf, p / 100.0))
+
+    return {
+        'min': float(non_zero[0]),
+        'max': float(non_zero[-1]),
+        'mean': mean,
+        'std': math.sqrt(variance),
+        'median': percentile(50),
+        'mode': float(np.argmax(hist)),
+        'percentiles': {str(p): percentile(p) for p in PERCENTILES}
+    }
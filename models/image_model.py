@@ -1,57 +1,65 @@
+import logging
+
 import cv2
 import numpy as np
 
-def convert_to_grayscale(image):
-   img=cv2.cvtColor(image,cv2.COLOR_BGR2GRAY)
+logger = logging.getLogger(__name__)
+
+def convert_to_grayscale(image, dst=None):
+   img=cv2.cvtColor(image,cv2.COLOR_BGR2GRAY,dst=dst)
    return img
 
-def resize_image(image, width, height):
+def gray_to_bgr(image_gray, dst=None):
+    """
+    Ré-étend une image en niveaux de gris sur 3 canaux (affichage).
+    """
+    return cv2.cvtColor(image_gray, cv2.COLOR_GRAY2BGR, dst=dst)
+
+def resize_image(image, width, height, dst=None):
     # Correction de l'ordre des paramètres pour cv2.resize
     # cv2.resize prend (image, (width, height))
     if width > 0 and height > 0:
-        img_resized = cv2.resize(image, (width, height))
+        img_resized = cv2.resize(image, (width, height), dst=dst)
         return img_resized
     return image
       
-def apply_blur(image,method='gaussian', kernel_size=5, **kwargs):
+def apply_blur(image,method='gaussian', kernel_size=5, dst=None, **kwargs):
 
     if kernel_size % 2 == 0:
         kernel_size += 1
     
-    blurred_image = image.copy()
-    
     try:
         if method == 'gaussian':
             
             sigma_x = kwargs.get('sigma_x', 0) 
-            blurred_image = cv2.GaussianBlur(image, (kernel_size, kernel_size), sigma_x)
+            blurred_image = cv2.GaussianBlur(image, (kernel_size, kernel_size), sigma_x, dst=dst)
             
         elif method == 'median':
-            blurred_image = cv2.medianBlur(image, kernel_size)
+            blurred_image = cv2.medianBlur(image, kernel_size, dst=dst)
             
         elif method == 'average':
-            blurred_image = cv2.blur(image, (kernel_size, kernel_size))
+            blurred_image = cv2.blur(image, (kernel_size, kernel_size), dst=dst)
             
         elif method == 'bilateral':
             # Bilateral Filter - Le filtre bilatéral est un outil de traitement d’image qui sert à réduire le bruit tout en conservant les contours nets,il prend en compte à la fois la proximité spatiale et la différence d’intensité des pixels pour effectuer le lissage.
             sigma_color = kwargs.get('sigma_color', 75)  # Color space sigma
             sigma_space = kwargs.get('sigma_space', 75)  # Coordinate space sigma
-            blurred_image = cv2.bilateralFilter(image, kernel_size, sigma_color, sigma_space)
+            blurred_image = cv2.bilateralFilter(image, kernel_size, sigma_color, sigma_space, dst=dst)
             
         elif method == 'motion':
             # Motion Blur - Le filtre motion (ou flou directionnel) est un filtre utilisé en traitement d’image pour simuler ou corriger le flou dû au mouvement d’un objet ou de la caméra. Il est surtout utilisé dans le contexte de la restauration d’image ou pour créer un effet artistique.
-            blurred_image = apply_motion_blur(image, kernel_size)
+            blurred_image = apply_motion_blur(image, kernel_size, dst=dst)
             
         else:
             raise ValueError(f"Unknown blur method: {method}")
             
     except Exception as e:
-        print(f"Error applying {method} blur: {e}")
+        logger.warning("Error applying %s blur: %s", method, e)
         return image
     
     return blurred_image
 
-def apply_motion_blur(image, kernel_size=15, angle=0):
+def apply_motion_blur(image, kernel_size=15, angle=0, dst=None):
     """Apply motion blur effect"""
     # Create motion blur kernel
     kernel = np.zeros((kernel_size, kernel_size))
@@ -63,9 +71,9 @@ def apply_motion_blur(image, kernel_size=15, angle=0):
     kernel = cv2.warpAffine(kernel, M, (kernel_size, kernel_size))
     
     # Apply the kernel
-    return cv2.filter2D(image, -1, kernel)
+    return cv2.filter2D(image, -1, kernel, dst=dst)
 
-def adjust_brightness(image, brightness=0):
+def adjust_brightness(image, brightness=0, dst=None):
     
     if brightness == 0:
         return image
@@ -80,9 +88,9 @@ def adjust_brightness(image, brightness=0):
     alpha = (highlight - shadow) / 255
     gamma = shadow
 
-    return cv2.addWeighted(image, alpha, image, 0, gamma)
+    return cv2.addWeighted(image, alpha, image, 0, gamma, dst=dst)
 
-def adjust_contrast(image, contrast=0):
+def adjust_contrast(image, contrast=0, dst=None):
     
     if contrast == 0:
         return image
@@ -91,7 +99,7 @@ def adjust_contrast(image, contrast=0):
     alpha = f
     gamma = 127 * (1 - f)
 
-    return cv2.addWeighted(image, alpha, image, 0, gamma)
+    return cv2.addWeighted(image, alpha, image, 0, gamma, dst=dst)
 
 def crop_image(image, x1, y1, x2, y2):
     """
@@ -106,7 +114,19 @@ def crop_image(image, x1, y1, x2, y2):
     """
     return image[y1:y2, x1:x2]
 
-def rotate_image(image, angle):
+def rotated_size(image, angle):
+    """
+    Dimensions (largeur, hauteur) du canevas qui contient l'image tournée.
+    """
+    (h, w) = image.shape[:2]
+    rotation_matrix = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    cos_angle = abs(rotation_matrix[0, 0])
+    sin_angle = abs(rotation_matrix[0, 1])
+    new_w = int((h * sin_angle) + (w * cos_angle))
+    new_h = int((h * cos_angle) + (w * sin_angle))
+    return new_w, new_h
+
+def rotate_image(image, angle, dst=None):
     # Obtenir les dimensions de l'image
     (h, w) = image.shape[:2]
     
@@ -117,20 +137,14 @@ def rotate_image(image, angle):
     rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
     
     # Calculer les nouvelles dimensions pour contenir l'image entière
-    # Calculer le cosinus et sinus de l'angle
-    cos_angle = abs(rotation_matrix[0, 0])
-    sin_angle = abs(rotation_matrix[0, 1])
-    
-    # Calculer les nouvelles dimensions
-    new_w = int((h * sin_angle) + (w * cos_angle))
-    new_h = int((h * cos_angle) + (w * sin_angle))
+    new_w, new_h = rotated_size(image, angle)
     
     # Ajuster la matrice de rotation pour le décalage
     rotation_matrix[0, 2] += (new_w / 2) - center[0]
     rotation_matrix[1, 2] += (new_h / 2) - center[1]
     
     # Effectuer la rotation avec les nouvelles dimensions
-    rotated = cv2.warpAffine(image, rotation_matrix, (new_w, new_h), 
+    rotated = cv2.warpAffine(image, rotation_matrix, (new_w, new_h), dst=dst,
                             flags=cv2.INTER_LINEAR, 
                             borderMode=cv2.BORDER_CONSTANT, 
                             borderValue=(0, 0, 0))
@@ -178,13 +192,13 @@ def rotate_right(image):
 
 
 
-def flip_image(image, mode):
+def flip_image(image, mode, dst=None):
    
     if mode == "horizontal":
-        return cv2.flip(image, 1)
+        return cv2.flip(image, 1, dst=dst)
 
     elif mode == "vertical":
-        return cv2.flip(image, 0)
+        return cv2.flip(image, 0, dst=dst)
 
     else:
         raise ValueError("Le mode doit être 'horizontal' ou 'vertical'")
@@ -217,20 +231,38 @@ def split_rgb_channels(image):
     b, g, r = cv2.split(image)
     return b, g, r
 
-def equalize_histogram(image_gray):
+_CHANNEL_MASKS = {
+    'blue': np.array([1, 0, 0], dtype=np.uint8),
+    'green': np.array([0, 1, 0], dtype=np.uint8),
+    'red': np.array([0, 0, 1], dtype=np.uint8),
+}
+
+def isolate_channel(image, channel, dst=None):
+    """
+    Conserve un seul canal BGR et met les deux autres à zéro, en une passe
+    (sans split ni merge).
+    """
+    mask = _CHANNEL_MASKS.get(channel)
+    if mask is None:
+        return image
+    if dst is None:
+        dst = np.empty_like(image)
+    return np.multiply(image, mask, out=dst)
+
+def equalize_histogram(image_gray, dst=None):
     """
     Applique l'égalisation d'histogramme sur une image en niveaux de gris.
     """
-    return cv2.equalizeHist(image_gray)
+    return cv2.equalizeHist(image_gray, dst=dst)
 
-def binary_threshold(image_gray, threshold_value=127):
+def binary_threshold(image_gray, threshold_value=127, dst=None):
     """
     Applique un seuillage binaire simple.
     """
-    _, binary = cv2.threshold(image_gray, threshold_value, 255, cv2.THRESH_BINARY)
+    _, binary = cv2.threshold(image_gray, threshold_value, 255, cv2.THRESH_BINARY, dst=dst)
     return binary
 
-def adaptive_threshold(image_gray):
+def adaptive_threshold(image_gray, dst=None):
     """
     Applique un seuillage adaptatif.
     """
@@ -240,20 +272,21 @@ def adaptive_threshold(image_gray):
         cv2.ADAPTIVE_THRESH_MEAN_C,
         cv2.THRESH_BINARY,
         11,
-        2
+        2,
+        dst=dst
     )
 
-def mean_based_threshold(image_gray):
+def mean_based_threshold(image_gray, dst=None):
     """
     Seuillage basé sur la moyenne des pixels.
     """
     mean_value = image_gray.mean()
-    _, binary = cv2.threshold(image_gray, mean_value, 255, cv2.THRESH_BINARY)
+    _, binary = cv2.threshold(image_gray, mean_value, 255, cv2.THRESH_BINARY, dst=dst)
     return binary
 
-def otsu_threshold(image_gray):
+def otsu_threshold(image_gray, dst=None):
     """
     Applique un seuillage avec la méthode d'Otsu.
     """
-    _, binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    _, binary = cv2.threshold(image_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)
     return binary
\ No newline at end of file
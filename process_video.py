@@ -0,0 +1,77 @@
+"""
+Traitement d'une vidéo ou d'une séquence d'images avec les opérations de
+l'application.
+
+Exemples :
+    python process_video.py clip.mp4 out.mp4 --ops "grayscale|blur:kernel_size=5"
+    python process_video.py "frames/img_%04d.png" "out/img_%04d.png" \\
+        --ops "threshold:type=otsu" --workers 4
+    python process_video.py clip.mp4 out.avi --ops "edge_detection:detector=canny,low=50,high=150"
+
+La recette utilise le format de /api/render : `op:clé=valeur,...|op2`.
+"""
+import argparse
+import json
+import logging
+import sys
+
+import cv2
+
+from controllers.preprocess_controller import OPERATIONS
+from controllers.video_controller import process_video
+from utils.recipe import RecipeError, parse_recipe
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Traitement vidéo image par image")
+    parser.add_argument('source', help='Vidéo ou séquence numérotée (ex. img_%%04d.png)')
+    parser.add_argument('output', help='Vidéo ou séquence numérotée de sortie')
+    parser.add_argument('--ops', required=True, help="Recette, ex. 'grayscale|blur:kernel_size=5'")
+    parser.add_argument('--workers', type=int, default=None, help='Threads de traitement (défaut: nombre de CPU)')
+    parser.add_argument('--batch-size', type=int, default=8, help='Images par lot')
+    parser.add_argument('--max-pending', type=int, default=None, help='Lots en mémoire (défaut: 2 par worker)')
+    parser.add_argument('--fourcc', help='Codec de la vidéo de sortie (ex. mp4v, MJPG)')
+    parser.add_argument('--fps', type=float, help='Images/s de la sortie (défaut: celles de la source)')
+    parser.add_argument('--verbose', action='store_true', help='Afficher les traces de traitement par image')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        steps = parse_recipe(args.ops, OPERATIONS)
+    except RecipeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if not steps:
+        print("❌ Recette vide", file=sys.stderr)
+        return 2
+
+    # Traces par image (niveau DEBUG de process_image) seulement sur demande
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(levelname)s %(name)s %(message)s')
+
+    # Le parallélisme est entre images : pas de threads OpenCV en plus
+    if args.workers != 1:
+        cv2.setNumThreads(1)
+
+    def progress(stats):
+        print(f"⏱  {stats['frames_written']} images, {stats['fps']} images/s", file=sys.stderr)
+
+    print(f"🎞  {args.source} → {args.output} ({len(steps)} opération(s))", file=sys.stderr)
+    try:
+        stats = process_video(args.source, args.output, steps, workers=args.workers,
+                              batch_size=args.batch_size, max_pending=args.max_pending,
+                              fourcc=args.fourcc, fps=args.fps, progress=progress)
+    except IOError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {stats['frames_written']} images en {stats['seconds']:.2f}s "
+          f"({stats['fps']} images/s, {stats['workers']} workers)", file=sys.stderr)
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,6 +14,7 @@ let appState = {
     history: [],
     historyIndex: -1,
     processing: false,
+    requestSeq: 0,
     zoomLevel: 1,
     isComparing: false,
     imageInfo: {
@@ -27,6 +28,24 @@ let appState = {
 let processingTimeout = null;
 let histogramTimeout = null;
 
+// Réglages par curseur : plusieurs requêtes peuvent être en vol, seule la
+// plus récente est affichée (le serveur abandonne les autres)
+const LATEST_WINS_OPERATIONS = ['brightness', 'contrast', 'hue', 'grayscale_partial'];
+
+// Opérations appliquées à l'image originale de la session
+const SESSION_OPERATIONS = ['brightness', 'contrast', 'hue', 'grayscale'];
+
+// Canal SSE persistant pour les réglages interactifs : aperçu basse
+// résolution immédiat puis image pleine résolution
+let streamState = {
+    source: null,
+    channelId: null,
+    ready: false,
+    sentImage: null,
+    // Requête envoyée sur le canal dont l'événement final n'est pas arrivé
+    pendingSeq: null
+};
+
 // Variables pour la modale histogramme
 let modalZoomLevel = 1;
 let modalActiveChannel = 'rgb';
@@ -41,6 +60,9 @@ function initializeApp() {
     // Test de connexion serveur
     checkServer();
     
+    // Canal de streaming pour les curseurs
+    openProcessingStream();
+    
     // Événements de base
     setupBasicEvents();
     
@@ -594,7 +616,14 @@ function showLoading(show) {
 }
 
 async function processImage(operation, params = {}) {
-    if (!appState.currentImageData || appState.processing) return;
+    if (!appState.currentImageData) return;
+    
+    const latestWins = LATEST_WINS_OPERATIONS.includes(operation);
+    if (appState.processing && !latestWins) return;
+    
+    const seq = ++appState.requestSeq;
+    const isStale = () => seq !== appState.requestSeq;
+    let streamed = false;
     
     appState.processing = true;
     setStatus(`Traitement: ${operation}...`, 'processing');
@@ -603,14 +632,25 @@ async function processImage(operation, params = {}) {
     try {
         console.log(`🔄 Traitement: ${operation}`, params);
         
+        // Réglages interactifs : canal SSE si disponible (le résultat arrive
+        // par les événements 'preview' puis 'result')
+        if (latestWins && streamState.ready) {
+            await pushStreamEdit(operation, params, seq);
+            streamState.pendingSeq = seq;
+            streamed = true;
+            return;
+        }
+        
         const payload = {
             operation: operation,
             params: params,
-            image: appState.currentImageData
+            image: appState.currentImageData,
+            client_session: appState.sessionId,
+            seq: seq
         };
         
         // Ajouter l'ID de session pour les opérations qui en ont besoin
-        if (appState.sessionId && ['brightness', 'contrast', 'hue', 'grayscale'].includes(operation)) {
+        if (appState.sessionId && SESSION_OPERATIONS.includes(operation)) {
             payload.session_id = appState.sessionId;
         }
         
@@ -620,6 +660,12 @@ async function processImage(operation, params = {}) {
             body: JSON.stringify(payload)
         });
         
+        // Requête remplacée par une plus récente : rien à afficher
+        if (response.status === 409 || isStale()) {
+            console.log(`⏭️ Requête ${seq} remplacée`);
+            return;
+        }
+        
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || `HTTP ${response.status}`);
@@ -629,36 +675,12 @@ async function processImage(operation, params = {}) {
         console.log('📥 Résultat:', data);
         
         if (data.success) {
-            appState.currentImageData = data.image;
-            
-            // Mettre à jour l'image immédiatement
-            const previewImg = document.getElementById('preview-image');
-            if (previewImg) {
-                previewImg.src = data.image;
-            }
-            
-            // Mettre à jour l'historique
-            if (appState.historyIndex < appState.history.length - 1) {
-                appState.history = appState.history.slice(0, appState.historyIndex + 1);
-            }
-            appState.history.push(data.image);
-            appState.historyIndex++;
-            
-            // Mettre à jour les infos de dimensions si fournies
-            if (data.dimensions) {
-                document.getElementById('image-dimensions').textContent = data.dimensions;
-            }
-            
-            setStatus(`✅ ${operation} terminé avec succès`, 'success');
-            
-            // Mettre à jour l'histogramme après certains traitements
-            if (['grayscale', 'brightness', 'contrast', 'histogram_equalization', 'threshold'].includes(operation)) {
-                updateHistogram('rgb');
-            }
+            applyProcessResult(data, operation);
         } else {
             throw new Error(data.error || 'Erreur inconnue');
         }
     } catch (error) {
+        if (isStale()) return;
         console.error('❌ Traitement error:', error);
         setStatus(`❌ Erreur: ${error.message}`, 'error');
         
@@ -672,9 +694,136 @@ async function processImage(operation, params = {}) {
             }
         }
     } finally {
+        // Seule la requête la plus récente libère l'interface (en streaming,
+        // c'est l'événement final du canal qui s'en charge)
+        if (!isStale() && !streamed) {
+            appState.processing = false;
+            showLoading(false);
+        }
+    }
+}
+
+function applyProcessResult(data, operation) {
+    appState.currentImageData = data.image;
+    
+    // Mettre à jour l'image immédiatement
+    const previewImg = document.getElementById('preview-image');
+    if (previewImg) {
+        previewImg.src = data.image;
+    }
+    
+    // Mettre à jour l'historique
+    if (appState.historyIndex < appState.history.length - 1) {
+        appState.history = appState.history.slice(0, appState.historyIndex + 1);
+    }
+    appState.history.push(data.image);
+    appState.historyIndex++;
+    
+    // Mettre à jour les infos de dimensions si fournies
+    if (data.dimensions) {
+        document.getElementById('image-dimensions').textContent = data.dimensions;
+    }
+    
+    setStatus(`✅ ${operation} terminé avec succès`, 'success');
+    
+    // Mettre à jour l'histogramme après certains traitements
+    if (['grayscale', 'brightness', 'contrast', 'histogram_equalization', 'threshold'].includes(operation)) {
+        updateHistogram('rgb');
+    }
+}
+
+function openProcessingStream() {
+    if (!window.EventSource) return;
+    
+    streamState.channelId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    const source = new EventSource(`/api/stream/${streamState.channelId}`);
+    streamState.source = source;
+    
+    source.addEventListener('ready', () => {
+        // Nouveau canal côté serveur (aussi après reconnexion) : renvoyer l'image
+        streamState.ready = true;
+        streamState.sentImage = null;
+    });
+    
+    source.addEventListener('preview', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.seq !== appState.requestSeq) return;
+        const previewImg = document.getElementById('preview-image');
+        if (previewImg) {
+            previewImg.src = data.image;
+        }
+    });
+    
+    source.addEventListener('result', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.seq !== appState.requestSeq) return;
+        streamState.pendingSeq = null;
+        applyProcessResult(data, data.operation);
         appState.processing = false;
         showLoading(false);
+    });
+    
+    ['superseded', 'busy', 'error'].forEach(type => {
+        source.addEventListener(type, (event) => {
+            const data = JSON.parse(event.data);
+            if (data.seq !== appState.requestSeq) return;
+            streamState.pendingSeq = null;
+            appState.processing = false;
+            showLoading(false);
+            if (type === 'busy') {
+                setStatus(`⏳ Serveur occupé, réessayez dans ${data.retry_after}s`, 'error');
+            } else if (type === 'error') {
+                setStatus(`❌ Erreur: ${data.error}`, 'error');
+            }
+        });
+    });
+    
+    source.onerror = () => {
+        // EventSource se reconnecte seul ; en attendant, repli sur /api/process
+        streamState.ready = false;
+        // Le résultat de la requête en cours ne viendra pas (nouveau canal
+        // côté serveur) : libérer l'interface
+        if (streamState.pendingSeq !== null) {
+            const lost = streamState.pendingSeq === appState.requestSeq;
+            streamState.pendingSeq = null;
+            if (lost) {
+                appState.processing = false;
+                showLoading(false);
+                setStatus('⚠️ Connexion interrompue, réessayez', 'error');
+            }
+        }
+    };
+}
+
+async function pushStreamEdit(operation, params, seq) {
+    const payload = {
+        operation: operation,
+        params: params,
+        seq: seq
+    };
+    
+    // Les opérations de session travaillent sur l'original côté serveur ;
+    // sinon, l'image n'est envoyée que lorsqu'elle change
+    if (appState.sessionId && SESSION_OPERATIONS.includes(operation)) {
+        payload.session_id = appState.sessionId;
     }
+    if (streamState.sentImage === null ||
+        (!payload.session_id && streamState.sentImage !== appState.currentImageData)) {
+        payload.image = appState.currentImageData;
+    }
+    
+    const response = await fetch(`/api/stream/${streamState.channelId}`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(payload)
+    });
+    
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.error || `HTTP ${response.status}`);
+    }
+    
+    streamState.sentImage = payload.image || streamState.sentImage;
 }
 
 function handleNavigation(element, section) {
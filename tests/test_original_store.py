@@ -0,0 +1,104 @@
+import threading
+import unittest
+
+import numpy as np
+
+from utils.original_store import OriginalStore
+
+
+def loader_for(value):
+    """Chargeur d'une petite image unie (valeur de pixel distincte par fichier)."""
+    def load():
+        return np.full((4, 4, 3), value, np.uint8), (4, 4)
+    return load
+
+
+class OriginalStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = OriginalStore()
+        self.dropped = []
+        self.store.on_drop = self.dropped.append
+
+    def test_same_file_is_shared(self):
+        entry, deduplicated = self.store.add('s1', b'a', loader_for(1))
+        self.assertFalse(deduplicated)
+        shared, deduplicated = self.store.add('s2', b'a', loader_for(1))
+        self.assertTrue(deduplicated)
+        self.assertIs(shared, entry)
+        self.assertEqual(entry.refcount, 2)
+        self.assertEqual(self.store.stats()['unique_images'], 1)
+
+    def test_same_pixels_from_other_bytes_are_shared(self):
+        entry, _ = self.store.add('s1', b'a', loader_for(1))
+        shared, deduplicated = self.store.add('s2', b'b', loader_for(1))
+        self.assertTrue(deduplicated)
+        self.assertIs(shared, entry)
+
+    def test_release_drops_last_reference(self):
+        entry, _ = self.store.add('s1', b'a', loader_for(1))
+        self.store.add('s2', b'a', loader_for(1))
+        self.assertIsNone(self.store.release('s1'))
+        self.assertEqual(entry.refcount, 1)
+        self.assertEqual(self.store.release('s2'), entry.digest)
+        self.assertEqual(self.dropped, [entry.digest])
+        self.assertIsNone(self.store.lookup(entry.digest))
+        self.assertIsNone(self.store.release('s2'))
+
+    def test_reupload_in_same_session_keeps_refcount(self):
+        entry, _ = self.store.add('s1', b'a', loader_for(1))
+        self.store.add('s1', b'a', loader_for(1))
+        self.store.add('s1', b'b', loader_for(1))
+        self.assertEqual(entry.refcount, 1)
+        self.assertEqual(self.dropped, [])
+
+    def test_replacing_original_releases_previous(self):
+        first, _ = self.store.add('s1', b'a', loader_for(1))
+        second, _ = self.store.add('s1', b'b', loader_for(2))
+        self.assertEqual(self.dropped, [first.digest])
+        self.assertEqual(second.refcount, 1)
+        self.assertEqual(self.store.digest('s1'), second.digest)
+        self.assertEqual(len(self.store), 1)
+
+    def test_replacing_shared_original_keeps_it_for_others(self):
+        first, _ = self.store.add('s1', b'a', loader_for(1))
+        self.store.add('s2', b'a', loader_for(1))
+        self.store.add('s1', b'b', loader_for(2))
+        self.assertEqual(first.refcount, 1)
+        self.assertEqual(self.dropped, [])
+        self.assertIs(self.store.entry('s2'), first)
+
+    def test_failed_decode_attaches_nothing(self):
+        entry, deduplicated = self.store.add('s1', b'a', lambda: None)
+        self.assertIsNone(entry)
+        self.assertNotIn('s1', self.store)
+
+    def test_concurrent_add_and_release(self):
+        barrier = threading.Barrier(8)
+
+        def churn(worker):
+            barrier.wait()
+            for i in range(200):
+                session_id = f'{worker}-{i % 5}'
+                self.store.add(session_id, bytes([i % 3]), loader_for(i % 3))
+                if i % 2:
+                    self.store.release(session_id)
+
+        threads = [threading.Thread(target=churn, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Chaque entrée restante est référencée exactement par ses sessions
+        sessions = self.store.sessions()
+        for digest in {entry.digest for _, entry in sessions}:
+            entry = self.store.lookup(digest)
+            self.assertEqual(entry.refcount, sum(e.digest == digest for _, e in sessions))
+        for session_id, _ in sessions:
+            self.store.release(session_id)
+        self.assertEqual(self.store.stats()['unique_images'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
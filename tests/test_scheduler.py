@@ -0,0 +1,147 @@
+import threading
+import time
+import unittest
+
+from utils.scheduler import ComputeScheduler, SchedulerBusy, SlotCancelled
+
+
+class ComputeSchedulerTest(unittest.TestCase):
+
+    def make(self, **kwargs):
+        kwargs.setdefault('max_concurrent', 2)
+        kwargs.setdefault('queue_timeout', 2.0)
+        return ComputeScheduler(**kwargs)
+
+    def wait_queued(self, scheduler, count):
+        deadline = time.monotonic() + 2
+        while scheduler.stats()['queued'] < count:
+            self.assertLess(time.monotonic(), deadline, 'requêtes jamais mises en file')
+            time.sleep(0.005)
+
+    def test_admits_up_to_max_concurrent(self):
+        scheduler = self.make()
+        scheduler._admit(0)
+        scheduler._admit(0)
+        self.assertEqual(scheduler.stats()['active'], 2)
+        self.assertEqual(scheduler.stats()['queued'], 0)
+
+    def test_two_slots_freed_at_once_admit_two_waiters(self):
+        scheduler = self.make()
+        scheduler._admit(0)
+        scheduler._admit(0)
+        head = threading.Event()
+
+        class SlowHeadCondition(threading.Condition):
+            """La tête de file reprend la main après l'autre waiter."""
+
+            def wait(self, timeout=None):
+                notified = super().wait(timeout)
+                if threading.current_thread().name == 'head' and not head.is_set():
+                    head.set()
+                    self.release()
+                    time.sleep(0.1)
+                    self.acquire()
+                return notified
+
+        scheduler._cond = SlowHeadCondition()
+        admitted = []
+        done = threading.Event()
+
+        def waiter():
+            with scheduler.slot():
+                admitted.append(threading.current_thread().name)
+                # Créneau gardé : sa libération ne réveille pas l'autre waiter
+                done.wait(5)
+
+        threads = []
+        for count, name in enumerate(('head', 'second'), 1):
+            thread = threading.Thread(target=waiter, name=name)
+            thread.start()
+            threads.append(thread)
+            self.wait_queued(scheduler, count)
+
+        # Les deux créneaux se libèrent avant qu'aucun waiter ne reprenne le verrou
+        with scheduler._cond:
+            scheduler._release(0.01)
+            scheduler._release(0.01)
+        deadline = time.monotonic() + 1.0
+        while len(admitted) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        both_admitted = sorted(admitted)
+        done.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(both_admitted, ['head', 'second'])
+        self.assertEqual(scheduler.stats()['rejected'], 0)
+
+    def test_priority_order(self):
+        scheduler = self.make(max_concurrent=1)
+        scheduler._admit(0)
+        order = []
+
+        def waiter(priority, name):
+            with scheduler.slot(priority):
+                order.append(name)
+
+        batch = threading.Thread(target=waiter, args=(2, 'batch'))
+        batch.start()
+        self.wait_queued(scheduler, 1)
+        interactive = threading.Thread(target=waiter, args=(0, 'interactive'))
+        interactive.start()
+        self.wait_queued(scheduler, 2)
+
+        scheduler._release(0.01)
+        batch.join(5)
+        interactive.join(5)
+        self.assertEqual(order, ['interactive', 'batch'])
+
+    def test_full_queue_is_rejected(self):
+        scheduler = self.make(max_concurrent=1, max_queue=0)
+        scheduler._admit(0)
+        with self.assertRaises(SchedulerBusy) as raised:
+            scheduler._admit(0)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(scheduler.stats()['rejected'], 1)
+
+    def test_queue_timeout(self):
+        scheduler = self.make(max_concurrent=1, queue_timeout=0.05)
+        scheduler._admit(0)
+        with self.assertRaises(SchedulerBusy):
+            scheduler._admit(0)
+        self.assertEqual(scheduler.stats()['queued'], 0)
+
+    def test_cancelled_waiter_leaves_queue(self):
+        scheduler = self.make(max_concurrent=1)
+        scheduler._admit(0)
+        cancel = threading.Event()
+        errors = []
+
+        def waiter():
+            try:
+                scheduler._admit(0, cancelled=cancel.is_set)
+            except SlotCancelled:
+                errors.append('cancelled')
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.wait_queued(scheduler, 1)
+        cancel.set()
+        scheduler.wake()
+        thread.join(5)
+
+        self.assertEqual(errors, ['cancelled'])
+        self.assertEqual(scheduler.stats()['queued'], 0)
+        self.assertEqual(scheduler.stats()['cancelled'], 1)
+
+    def test_slot_releases_on_error(self):
+        scheduler = self.make(max_concurrent=1)
+        with self.assertRaises(RuntimeError):
+            with scheduler.slot():
+                raise RuntimeError('échec')
+        self.assertEqual(scheduler.stats()['active'], 0)
+        self.assertEqual(scheduler.stats()['completed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+
+from utils.sequencer import RequestSequencer
+
+
+class RequestSequencerTest(unittest.TestCase):
+
+    def test_latest_request_wins(self):
+        sequencer = RequestSequencer()
+        self.assertTrue(sequencer.announce('s', 1))
+        self.assertTrue(sequencer.announce('s', 3))
+        self.assertFalse(sequencer.announce('s', 2))
+        self.assertTrue(sequencer.is_stale('s', 1))
+        self.assertFalse(sequencer.is_stale('s', 3))
+        self.assertFalse(sequencer.is_stale('inconnue', 1))
+
+    def test_sessions_are_independent(self):
+        sequencer = RequestSequencer()
+        sequencer.announce('a', 10)
+        sequencer.announce('b', 1)
+        self.assertFalse(sequencer.is_stale('b', 1))
+        self.assertTrue(sequencer.is_stale('a', 9))
+
+    def test_least_recently_active_session_is_evicted(self):
+        sequencer = RequestSequencer(max_sessions=2)
+        sequencer.announce('a', 1)
+        sequencer.announce('b', 1)
+        sequencer.announce('a', 2)
+        sequencer.announce('c', 1)
+        self.assertEqual(sequencer.stats()['sessions'], 2)
+        self.assertTrue(sequencer.is_stale('a', 1))
+        self.assertFalse(sequencer.is_stale('b', 0))
+
+    def test_idle_sessions_expire(self):
+        sequencer = RequestSequencer(max_idle=0.02)
+        sequencer.announce('a', 5)
+        sequencer.record_drop('a')
+        time.sleep(0.05)
+        sequencer.announce('b', 1)
+        self.assertFalse(sequencer.is_stale('a', 1))
+        self.assertEqual(sequencer.coalesced('a'), 0)
+        self.assertEqual(sequencer.stats()['evicted'], 1)
+
+    def test_drops_are_not_kept_for_forgotten_sessions(self):
+        sequencer = RequestSequencer()
+        sequencer.announce('a', 1)
+        self.assertEqual(sequencer.record_drop('a'), 1)
+        self.assertEqual(sequencer.record_drop('a'), 2)
+        sequencer.forget('a')
+        self.assertEqual(sequencer.coalesced('a'), 0)
+        self.assertEqual(sequencer.record_drop('a'), 1)
+        self.assertEqual(sequencer.coalesced('a'), 0)
+        self.assertEqual(sequencer.stats()['coalesced'], 3)
+
+    def test_concurrent_announces_keep_highest(self):
+        sequencer = RequestSequencer()
+        barrier = threading.Barrier(8)
+
+        def announce(start):
+            barrier.wait()
+            for seq in range(start, 2000, 8):
+                sequencer.announce('s', seq)
+
+        threads = [threading.Thread(target=announce, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(sequencer.is_stale('s', 1999))
+        self.assertTrue(sequencer.is_stale('s', 1998))
+
+
+if __name__ == '__main__':
+    unittest.main()
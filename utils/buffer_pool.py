@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class BufferSet:
+    """
+    Jeu de tampons de sortie nommés, utilisé par un seul worker à la fois.
+
+    Un tampon est réalloué seulement quand la forme ou le type demandé
+    change (nouvelle résolution de session). Son contenu reste valide
+    jusqu'au prochain `get` du même nom : il faut le copier pour le
+    conserver au-delà du bail.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Retourne le tampon `name` de forme `shape` (contenu non initialisé)."""
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._buffers[name] = buf
+            self._pool._count_allocation()
+        return buf
+
+    def like(self, name, image):
+        """Tampon de même forme et même type que `image`."""
+        return self.get(name, image.shape, image.dtype)
+
+    @property
+    def nbytes(self):
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+
+class BufferPool:
+    """
+    Pool de jeux de tampons partagé par les workers.
+
+    Le serveur Flask crée un thread par requête : les tampons ne peuvent
+    donc pas être rattachés au thread. Chaque requête emprunte un jeu
+    (`lease`) et le rend à la fin ; en régime établi, le nombre de jeux
+    correspond au nombre de requêtes simultanées.
+    """
+
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self._idle = []
+        self._leased = 0
+        self._lock = threading.Lock()
+        self.allocations = 0
+
+    def _count_allocation(self):
+        with self._lock:
+            self.allocations += 1
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            buffers = self._idle.pop() if self._idle else BufferSet(self)
+            self._leased += 1
+        try:
+            yield buffers
+        finally:
+            with self._lock:
+                self._leased -= 1
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(buffers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle_sets': len(self._idle),
+                'leased_sets': self._leased,
+                'bytes': sum(b.nbytes for b in self._idle),
+                'allocations': self.allocations
+            }
+
+
+# Pool partagé par les routes Flask
+buffer_pool = BufferPool()
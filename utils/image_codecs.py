@@ -0,0 +1,314 @@
+"""
+Encodage et décodage des images avec plusieurs backends (OpenCV, Pillow).
+
+Toutes les images manipulées sont au format OpenCV : uint8, BGR (ou
+niveaux de gris en 2-D pour l'encodage). Un benchmark au démarrage
+choisit le backend le plus rapide par opération, format et classe de
+taille ; OpenCV sert par défaut et en repli.
+"""
+import io
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+FORMATS = ('png', 'jpg', 'webp', 'tiff')
+
+MIMETYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+    'tiff': 'image/tiff'
+}
+
+# Classes de taille (pixels) : un backend peut gagner sur les petites
+# images et perdre sur les grandes
+SIZE_CLASSES = (('small', 640 * 480), ('medium', 1920 * 1080), ('large', None))
+
+# Taille d'image de test par classe pour le benchmark
+BENCHMARK_SIZES = {'small': (640, 480), 'medium': (1920, 1080), 'large': (2560, 1600)}
+
+
+def size_class(width, height):
+    pixels = width * height
+    for name, limit in SIZE_CLASSES:
+        if limit is None or pixels <= limit:
+            return name
+
+
+def sniff_format(data):
+    """Format d'après les premiers octets, None si inconnu."""
+    head = bytes(data[:12])
+    if head.startswith(b'\xff\xd8'):
+        return 'jpg'
+    if head.startswith(b'\x89PNG'):
+        return 'png'
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    return None
+
+
+class OpenCVBackend:
+    name = 'opencv'
+
+    def decode(self, data, fit=None):
+        """Retourne (image BGR, (largeur, hauteur) d'origine) ou None."""
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return image, (image.shape[1], image.shape[0])
+
+    def encode(self, image, format, quality=95, progressive=False, optimize=False, compress=False):
+        """Retourne les octets encodés, ou None."""
+        if format == 'jpg':
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            if progressive:
+                params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+            if optimize:
+                params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        elif format == 'webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        elif format == 'tiff':
+            # 8 = compression Deflate (Adobe) de libtiff ; LZW par défaut
+            params = [cv2.IMWRITE_TIFF_COMPRESSION, 8] if compress else []
+        else:
+            params = []
+        success, buffer = cv2.imencode('.' + format, image, params)
+        return buffer.tobytes() if success else None
+
+
+class PillowBackend:
+    name = 'pillow'
+
+    # Modes que Pillow convertit en RGB comme OpenCV (les autres : repli)
+    _MODES = ('RGB', 'L', 'RGBA', 'LA', 'P', 'CMYK', 'YCbCr', '1')
+
+    def size(self, data):
+        """Dimensions lues dans l'en-tête seulement (orientation EXIF comprise)."""
+        try:
+            with Image.open(io.BytesIO(data)) as im:
+                width, height = im.size
+                if im.getexif().get(0x0112) in (5, 6, 7, 8):
+                    width, height = height, width
+                return width, height
+        except Exception:
+            return None
+
+    def decode(self, data, fit=None):
+        """
+        Retourne (image BGR, (largeur, hauteur) d'origine) ou None.
+
+        Avec `fit` (largeur, hauteur maximales), un JPEG est décodé en mode
+        draft : réduction DCT 1/2, 1/4 ou 1/8 tant que l'image reste au
+        moins aussi grande que la cible. L'appelant finit la réduction.
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as im:
+                if im.mode not in self._MODES:
+                    return None
+                width, height = im.size
+                rotated = im.getexif().get(0x0112) in (5, 6, 7, 8)
+                if rotated:
+                    width, height = height, width
+                if fit is not None and im.format == 'JPEG':
+                    scale = max(width / fit[0], height / fit[1])
+                    if scale > 1:
+                        target = (math.ceil(width / scale), math.ceil(height / scale))
+                        im.draft('RGB', target[::-1] if rotated else target)
+                im = ImageOps.exif_transpose(im)
+                if im.mode == 'L':
+                    image = cv2.cvtColor(np.asarray(im), cv2.COLOR_GRAY2BGR)
+                else:
+                    image = cv2.cvtColor(np.asarray(im.convert('RGB')), cv2.COLOR_RGB2BGR)
+                return image, (width, height)
+        except Exception:
+            return None
+
+    def encode(self, image, format, quality=95, progressive=False, optimize=False, compress=False):
+        """Retourne les octets encodés, ou None (image non gérée : repli)."""
+        if image.dtype != np.uint8 or not (image.ndim == 2 or image.shape[2] == 3):
+            return None
+        if image.ndim == 2:
+            pil_image = Image.fromarray(image, 'L')
+        else:
+            pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), 'RGB')
+        output = io.BytesIO()
+        if format == 'jpg':
+            pil_image.save(output, 'JPEG', quality=quality, progressive=progressive, optimize=optimize)
+        elif format == 'webp':
+            pil_image.save(output, 'WEBP', quality=quality)
+        elif format == 'tiff':
+            pil_image.save(output, 'TIFF', compression='tiff_adobe_deflate' if compress else 'tiff_lzw')
+        elif format == 'png':
+            # Même niveau que le défaut d'OpenCV (vitesse)
+            pil_image.save(output, 'PNG', compress_level=1)
+        else:
+            return None
+        return output.getvalue()
+
+
+def _benchmark_image(width, height, seed=0):
+    """Image de test réaliste : grandes zones lisses, contours et bruit."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (max(2, height // 32), max(2, width // 32), 3), dtype=np.uint8)
+    image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    cv2.circle(image, (width // 2, height // 2), min(width, height) // 4, (240, 240, 240), 3)
+    noise = rng.integers(0, 12, (height, width, 3), dtype=np.uint8)
+    return cv2.add(image, noise)
+
+
+class CodecRegistry:
+    """
+    Backends de codec disponibles et choix par (opération, format,
+    classe de taille). Opérations : 'encode', 'decode' et 'decode_fit'
+    (décodage avec réduction à une taille maximale, comme à l'upload).
+    """
+
+    def __init__(self):
+        self.backends = {'opencv': OpenCVBackend()}
+        if HAS_PILLOW:
+            self.backends['pillow'] = PillowBackend()
+        self.default = 'opencv'
+        # Backend imposé (configuration), sinon choix du benchmark
+        self.forced = None
+        self._choices = {}
+        self._lock = threading.Lock()
+        self.benchmark_report = None
+
+    def _backend(self, operation, format, size):
+        name = self.forced or self._choices.get((operation, format, size), self.default)
+        return self.backends.get(name, self.backends[self.default])
+
+    def _data_size_class(self, data):
+        # Classe de taille d'après l'en-tête, seulement s'il y a un choix à faire
+        pillow = self.backends.get('pillow')
+        dimensions = pillow.size(data) if pillow is not None else None
+        return size_class(*dimensions) if dimensions else 'medium'
+
+    def decode(self, data, fit=None):
+        """Retourne (image BGR, (largeur, hauteur) d'origine) ou None."""
+        format = sniff_format(data)
+        backend = self.backends[self.default]
+        if format is not None and (self.forced or self._choices):
+            operation = 'decode_fit' if fit is not None else 'decode'
+            backend = self._backend(operation, format, self._data_size_class(data))
+        decoded = backend.decode(data, fit)
+        if decoded is None and backend.name != self.default:
+            decoded = self.backends[self.default].decode(data, fit)
+        return decoded
+
+    def encode(self, image, format, **options):
+        """Encode `image` au format `format` ; retourne les octets ou None."""
+        backend = self._backend('encode', format, size_class(image.shape[1], image.shape[0]))
+        encoded = backend.encode(image, format, **options)
+        if encoded is None and backend.name != self.default:
+            encoded = self.backends[self.default].encode(image, format, **options)
+        return encoded
+
+    def warm_up(self, size=(320, 240)):
+        """
+        Premier encodage/décodage de chaque format avec chaque backend
+        (initialisation des bibliothèques). Retourne les durées en ms.
+        """
+        image = _benchmark_image(*size)
+        timings = {}
+        for format in FORMATS:
+            for name, backend in self.backends.items():
+                started = time.perf_counter()
+                encoded = backend.encode(image, format)
+                decoded = backend.decode(encoded) if encoded is not None else None
+                timings[f'{format}/{name}'] = (round((time.perf_counter() - started) * 1000, 2)
+                                               if decoded is not None else None)
+        return timings
+
+    def benchmark(self, repeat=1, fit=(1920, 1080), stop=None):
+        """
+        Mesure chaque backend pour chaque format et classe de taille et
+        retient le plus rapide (à appeler après `warm_up`). Retourne le
+        rapport : choix et durées en ms, ou None si `stop` (Event) est
+        levé avant la fin.
+        """
+        choices = {}
+        timings = {}
+
+        def measure(function):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = function()
+                elapsed = time.perf_counter() - started
+                if result is None:
+                    return None
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        for size, (width, height) in BENCHMARK_SIZES.items():
+            image = _benchmark_image(width, height)
+            for format in FORMATS:
+                options = {'quality': 90} if format in ('jpg', 'webp') else {}
+                reference = self.backends[self.default].encode(image, format, **options)
+                if reference is None:
+                    continue
+                operations = {
+                    'encode': lambda b: b.encode(image, format, **options),
+                    'decode': lambda b: b.decode(reference),
+                }
+                if width > fit[0] or height > fit[1]:
+                    operations['decode_fit'] = lambda b: b.decode(reference, fit)
+                for operation, run in operations.items():
+                    if stop is not None and stop.is_set():
+                        return None
+                    results = {}
+                    for name, backend in self.backends.items():
+                        seconds = measure(lambda: run(backend))
+                        if seconds is not None:
+                            results[name] = round(seconds * 1000, 2)
+                    if results:
+                        key = f'{operation}/{format}/{size}'
+                        timings[key] = results
+                        choices[(operation, format, size)] = min(results, key=results.get)
+
+        # Sans réduction nécessaire, décoder avec ou sans cible revient au même
+        for (operation, format, size), name in list(choices.items()):
+            if operation == 'decode':
+                choices.setdefault(('decode_fit', format, size), name)
+
+        with self._lock:
+            self._choices = choices
+            self.benchmark_report = {
+                'choices': {'/'.join(key): name for key, name in sorted(choices.items())},
+                'timings_ms': timings
+            }
+        return self.benchmark_report
+
+    def stats(self):
+        return {
+            'backends': list(self.backends),
+            'forced': self.forced,
+            'benchmark': self.benchmark_report
+        }
+
+
+# Registre partagé par l'application
+codec_registry = CodecRegistry()
+
+
+def decode_image(data, fit=None):
+    """Décode des octets d'image en BGR ; None si le décodage échoue."""
+    decoded = codec_registry.decode(data, fit)
+    return decoded[0] if decoded is not None else None
+
+
+def encode_image(image, format='png', **options):
+    """Encode une image (format de FORMATS) ; None si l'encodage échoue."""
+    return codec_registry.encode(image, format, **options)
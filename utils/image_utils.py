@@ -2,18 +2,17 @@ import cv2
 import numpy as np
 import base64  # Ajout de cet import
 
+from utils.image_codecs import decode_image, encode_image
+
 def encode_image_to_base64(image):
     """Convert OpenCV image to base64 string"""
-    _, buffer = cv2.imencode('.png', image)
-    return base64.b64encode(buffer).decode('utf-8')
+    return base64.b64encode(encode_image(image, 'png')).decode('utf-8')
 
 def decode_base64_to_image(base64_string):
     """Convert base64 string to OpenCV image"""
     if ',' in base64_string:
         base64_string = base64_string.split(',')[1]
-    img_data = base64.b64decode(base64_string)
-    nparr = np.frombuffer(img_data, np.uint8)
-    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    return decode_image(base64.b64decode(base64_string))
 
 def get_image_info(image):
     """Get basic image information"""
@@ -0,0 +1,67 @@
+import threading
+import tracemalloc
+
+
+def process_rss():
+    """Mémoire résidente du processus en octets (Linux), None si indisponible."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemoryTracer:
+    """
+    Suivi tracemalloc à la demande : `start` prend un instantané de
+    référence, `diff` renvoie les N plus fortes évolutions depuis.
+
+    tracemalloc ralentit toutes les allocations Python : il n'est actif
+    qu'entre `start` et `stop`.
+    """
+
+    def __init__(self):
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = tracemalloc.take_snapshot()
+        return self.status()
+
+    def stop(self):
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._baseline = None
+        return self.status()
+
+    def diff(self, top=10, key_type='lineno'):
+        """Top-N des écarts d'allocation depuis l'instantané de référence."""
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                return None
+            snapshot = tracemalloc.take_snapshot()
+            # Les allocations de tracemalloc lui-même faussent le classement
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            stats = snapshot.filter_traces(filters).compare_to(
+                self._baseline.filter_traces(filters), key_type)
+        return [{
+            'location': str(stat.traceback),
+            'size_diff': stat.size_diff,
+            'size': stat.size,
+            'count_diff': stat.count_diff
+        } for stat in stats[:top]]
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {'active': self.active, 'traced_bytes': current, 'traced_peak': peak}
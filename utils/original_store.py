@@ -0,0 +1,252 @@
+import hashlib
+import threading
+
+
+def content_digest(data):
+    """Empreinte d'un contenu (octets du fichier ou pixels décodés)."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def pixel_digest(image):
+    """Empreinte des pixels décodés (forme et type inclus)."""
+    header = f'{image.shape}:{image.dtype}'.encode('ascii')
+    return content_digest(header + image.tobytes())
+
+
+class OriginalEntry:
+    """Image originale partagée par toutes les sessions qui l'ont uploadée."""
+
+    def __init__(self, digest, image, original_dimensions, loader=None, nbytes=0):
+        self.digest = digest
+        self.original_dimensions = original_dimensions
+        self.refcount = 0
+        # Data URL PNG renvoyée à l'upload, calculée une seule fois
+        self.data_url = None
+        # Entrée rechargée depuis le disque : pixels lus au premier accès
+        self._image = image
+        self._loader = loader
+        self._image_nbytes = image.nbytes if image is not None else nbytes
+
+    @property
+    def loaded(self):
+        return self._loader is None
+
+    @property
+    def image(self):
+        if self._loader is not None:
+            self._image, self._loader = self._loader(), None
+        return self._image
+
+    @property
+    def nbytes(self):
+        return self._image_nbytes + (len(self.data_url) if self.data_url else 0)
+
+
+class OriginalStore:
+    """
+    Images originales adressées par leur contenu, avec comptage de
+    références entre sessions.
+
+    Un même fichier uploadé plusieurs fois n'est décodé et stocké qu'une
+    fois ; deux fichiers différents qui donnent les mêmes pixels partagent
+    aussi la même entrée. S'utilise comme un dictionnaire session -> image.
+
+    Avec `persistence` (SessionPersistence), chaque changement est
+    sauvegardé en arrière-plan et `restore` recharge l'index au
+    démarrage ; les pixels ne sont relus qu'au premier accès.
+    """
+
+    def __init__(self, persistence=None):
+        self._entries = {}       # empreinte pixels -> OriginalEntry
+        self._file_index = {}    # empreinte fichier -> empreinte pixels
+        self._sessions = {}      # session_id -> empreinte pixels
+        self._lock = threading.RLock()
+        self.deduplicated = 0
+        self.persistence = persistence
+        # Appelé avec l'empreinte d'une entrée supprimée (caches dérivés à oublier)
+        self.on_drop = None
+
+    def add(self, session_id, file_bytes, loader):
+        """
+        Associe à `session_id` l'original contenu dans `file_bytes`.
+
+        `loader()` n'est appelé que si ces octets sont inconnus ; il
+        retourne (image, dimensions d'origine) ou None si le décodage
+        échoue. Retourne (OriginalEntry, dédupliqué) ou (None, False).
+        """
+        file_key = content_digest(file_bytes)
+        with self._lock:
+            digest = self._file_index.get(file_key)
+            entry = self._entries.get(digest) if digest else None
+            if entry is not None:
+                self.deduplicated += 1
+                self._attach(session_id, entry)
+                return entry, True
+
+        loaded = loader()
+        if loaded is None:
+            return None, False
+        image, original_dimensions = loaded
+        digest = pixel_digest(image)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            deduplicated = entry is not None
+            if deduplicated:
+                self.deduplicated += 1
+            else:
+                image.setflags(write=False)
+                entry = OriginalEntry(digest, image, original_dimensions)
+                self._entries[digest] = entry
+                if self.persistence is not None:
+                    self.persistence.save_original(digest, image)
+            self._file_index[file_key] = digest
+            self._attach(session_id, entry)
+            return entry, deduplicated
+
+    def _attach(self, session_id, entry):
+        previous = self._sessions.get(session_id)
+        if previous == entry.digest:
+            # Même original ré-uploadé dans la même session : rien ne change
+            return
+        # Référencer la nouvelle entrée avant de lâcher l'ancienne
+        entry.refcount += 1
+        self._sessions[session_id] = entry.digest
+        if previous is not None:
+            self._unref(previous)
+        if self.persistence is not None:
+            self.persistence.save_index()
+
+    def _unref(self, digest):
+        """Retire une référence ; retourne True si l'entrée a été supprimée."""
+        entry = self._entries.get(digest)
+        if entry is None:
+            return False
+        entry.refcount -= 1
+        if entry.refcount > 0:
+            return False
+        self._drop(digest)
+        return True
+
+    def release(self, session_id):
+        """
+        Détache une session ; retourne l'empreinte de l'entrée si elle
+        n'est plus référencée (et donc supprimée), sinon None.
+        """
+        with self._lock:
+            digest = self._sessions.pop(session_id, None)
+            if digest is None:
+                return None
+            if self._unref(digest):
+                return digest
+            if self.persistence is not None:
+                self.persistence.save_index()
+            return None
+
+    def _drop(self, digest):
+        self._entries.pop(digest, None)
+        for file_key in [k for k, d in self._file_index.items() if d == digest]:
+            del self._file_index[file_key]
+        for session_id in [s for s, d in self._sessions.items() if d == digest]:
+            del self._sessions[session_id]
+        if self.persistence is not None:
+            self.persistence.delete_original(digest)
+        if self.on_drop is not None:
+            self.on_drop(digest)
+
+    def _available(self, entry):
+        # Original rechargé illisible (fichier absent) : l'entrée est oubliée
+        if entry is not None and entry.image is None:
+            self._drop(entry.digest)
+            return None
+        return entry
+
+    def entry(self, session_id):
+        with self._lock:
+            digest = self._sessions.get(session_id)
+            return self._available(self._entries.get(digest) if digest else None)
+
+    def lookup(self, digest):
+        """Entrée d'une image par son empreinte (identifiant d'image)."""
+        with self._lock:
+            return self._available(self._entries.get(digest))
+
+    def sessions(self):
+        """Instantané des sessions : liste de (session_id, OriginalEntry)."""
+        with self._lock:
+            return [(sid, self._entries[d]) for sid, d in self._sessions.items()
+                    if d in self._entries]
+
+    def digest(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    # Interface dictionnaire session_id -> image
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def __getitem__(self, session_id):
+        entry = self.entry(session_id)
+        if entry is None:
+            raise KeyError(session_id)
+        return entry.image
+
+    def get(self, session_id, default=None):
+        entry = self.entry(session_id)
+        return entry.image if entry is not None else default
+
+    def __delitem__(self, session_id):
+        if session_id not in self:
+            raise KeyError(session_id)
+        self.release(session_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def snapshot(self):
+        """Index sérialisable (sans les pixels) pour la persistance."""
+        with self._lock:
+            return {
+                'sessions': dict(self._sessions),
+                'files': dict(self._file_index),
+                'entries': {digest: {'original_dimensions': list(entry.original_dimensions),
+                                     'nbytes': entry._image_nbytes}
+                            for digest, entry in self._entries.items()}
+            }
+
+    def restore(self, index):
+        """
+        Recharge un index sauvegardé. Les originaux restent sur disque
+        jusqu'à leur premier accès (mmap en lecture seule).
+        """
+        if self.persistence is None or not index:
+            return 0
+        with self._lock:
+            for digest, info in index.get('entries', {}).items():
+                self._entries[digest] = OriginalEntry(
+                    digest, None, tuple(info['original_dimensions']),
+                    loader=lambda d=digest: self.persistence.load_array(d),
+                    nbytes=info.get('nbytes', 0))
+            for session_id, digest in index.get('sessions', {}).items():
+                entry = self._entries.get(digest)
+                if entry is not None:
+                    self._sessions[session_id] = digest
+                    entry.refcount += 1
+            self._file_index.update({k: d for k, d in index.get('files', {}).items()
+                                     if d in self._entries})
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'sessions': len(self._sessions),
+                'unique_images': len(self._entries),
+                'bytes': sum(e.nbytes for e in self._entries.values()),
+                'deduplicated_uploads': self.deduplicated
+            }
+            if self.persistence is not None:
+                stats['on_disk_only'] = sum(not e.loaded for e in self._entries.values())
+                stats['persistence'] = self.persistence.stats()
+            return stats
@@ -0,0 +1,177 @@
+import threading
+import hashlib
+from collections import OrderedDict
+
+import cv2
+
+
+def image_version(image_data):
+    """
+    Identifiant de version d'une image envoyée par le client.
+
+    Le hash porte sur la chaîne base64 reçue : deux requêtes qui envoient
+    la même image partagent la même version (et donc les mêmes plans).
+    """
+    if isinstance(image_data, str):
+        image_data = image_data.encode('ascii', 'ignore')
+    return hashlib.blake2b(image_data, digest_size=16).hexdigest()
+
+
+def _readonly(array):
+    # Les plans sont partagés entre requêtes : toute écriture doit échouer
+    array.setflags(write=False)
+    return array
+
+
+class DerivedPlanes:
+    """
+    Plans dérivés d'une version d'image, calculés à la demande.
+
+    Contient l'image BGR décodée, le plan en niveaux de gris, le YCrCb,
+    le HSV et les gradients de Sobel. Tous les tableaux sont en lecture seule.
+    """
+
+    def __init__(self, image):
+        self.image = _readonly(image)
+        self._gray = None
+        self._ycrcb = None
+        self._hsv = None
+        self._sobel = None
+        self._previews = {}
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            if len(self.image.shape) == 2:
+                self._gray = self.image
+            else:
+                self._gray = _readonly(cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+        return self._gray
+
+    @property
+    def ycrcb(self):
+        if self._ycrcb is None:
+            self._ycrcb = _readonly(cv2.cvtColor(self.image, cv2.COLOR_BGR2YCrCb))
+        return self._ycrcb
+
+    @property
+    def hsv(self):
+        if self._hsv is None:
+            self._hsv = _readonly(cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV))
+        return self._hsv
+
+    @property
+    def sobel(self):
+        """Gradients (gx, gy) en float32, noyau 3x3."""
+        if self._sobel is None:
+            gray = self.gray
+            sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+            sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+            self._sobel = (_readonly(sobelx), _readonly(sobely))
+        return self._sobel
+
+    def preview(self, max_side):
+        """
+        Plans d'une version réduite (plus grand côté <= `max_side`),
+        calculée une seule fois. Retourne `self` si l'image est déjà petite.
+        """
+        h, w = self.image.shape[:2]
+        scale = max_side / max(h, w)
+        if scale >= 1:
+            return self
+        planes = self._previews.get(max_side)
+        if planes is None:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            small = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA)
+            planes = DerivedPlanes(small)
+            self._previews[max_side] = planes
+        return planes
+
+    @property
+    def nbytes(self):
+        total = self.image.nbytes
+        if self._gray is not None and self._gray is not self.image:
+            total += self._gray.nbytes
+        if self._ycrcb is not None:
+            total += self._ycrcb.nbytes
+        if self._hsv is not None:
+            total += self._hsv.nbytes
+        if self._sobel is not None:
+            total += self._sobel[0].nbytes + self._sobel[1].nbytes
+        for planes in list(self._previews.values()):
+            total += planes.nbytes
+        return total
+
+
+class PlaneCache:
+    """
+    Cache LRU des plans dérivés, indexé par version d'image.
+
+    Une nouvelle version d'image produit une nouvelle clé : les plans de
+    l'ancienne version ne sont plus servis et finissent évincés.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retourne les plans de la version `key`, ou None."""
+        with self._lock:
+            planes = self._entries.get(key)
+            if planes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return planes
+
+    def put(self, key, image):
+        """Enregistre une image décodée pour la version `key`."""
+        planes = DerivedPlanes(image)
+        with self._lock:
+            self._entries[key] = planes
+            self._entries.move_to_end(key)
+            self._evict()
+        return planes
+
+    def get_or_load(self, key, loader):
+        """
+        Retourne les plans de `key` ; sur un échec, `loader()` fournit
+        l'image décodée (None si le décodage échoue).
+        """
+        planes = self.get(key)
+        if planes is not None:
+            return planes
+        image = loader()
+        if image is None:
+            return None
+        return self.put(key, image)
+
+    def peek(self, key):
+        """Plans de `key` sans toucher à l'ordre LRU ni aux compteurs."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self):
+        # Garder toujours l'entrée la plus récente, même si elle dépasse le budget
+        total = sum(p.nbytes for p in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, planes = self._entries.popitem(last=False)
+            total -= planes.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(p.nbytes for p in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
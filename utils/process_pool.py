@@ -0,0 +1,267 @@
+"""
+Exécution des opérations dans un pool de processus.
+
+Une partie du traitement garde le GIL (réductions numpy, aiguillage
+Python de process_image) : au-delà d'un ou deux cœurs, ajouter des
+threads de requête n'apporte plus rien. Les classes d'opérations
+choisies sont donc envoyées à des processus de travail ; les autres
+restent dans le processus du serveur.
+
+Les pixels ne sont pas sérialisés : l'image d'entrée est copiée dans un
+segment `multiprocessing.shared_memory` que le worker projette, et le
+worker rend son résultat dans un segment qu'il crée. Le processus
+serveur libère (unlink) les deux segments.
+"""
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+    HAS_SHARED_MEMORY = True
+except ImportError:
+    # Python < 3.8 : pas de pool, tout reste dans le processus serveur
+    HAS_SHARED_MEMORY = False
+
+# Classes d'opérations (unité de choix du backend)
+OPERATION_CLASSES = {
+    'pixel': ('grayscale', 'brightness', 'contrast', 'channel_split', 'flip'),
+    'geometry': ('resize', 'rotate', 'crop'),
+    'filter': ('blur', 'edge_detection'),
+    'histogram': ('threshold', 'equalize', 'histogram_equalization'),
+}
+
+
+def operation_class(operation):
+    for name, operations in OPERATION_CLASSES.items():
+        if operation in operations:
+            return name
+    return None
+
+
+def in_worker_process():
+    """
+    Vrai dans un processus de travail. Avec le démarrage « spawn », le
+    worker réexécute le script principal (app.py) : ses effets de bord
+    (préchauffage, pool) doivent être évités.
+    """
+    return multiprocessing.current_process().name != 'MainProcess'
+
+
+class SharedArray:
+    """Tableau numpy dans un segment de mémoire partagée."""
+
+    def __init__(self, shape, dtype, name=None):
+        create = name is None
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.array = np.ndarray(shape, dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def copy_of(cls, image):
+        shared = cls(image.shape, image.dtype)
+        np.copyto(shared.array, image)
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        name, shape, dtype = descriptor
+        return cls(shape, dtype, name=name)
+
+    def descriptor(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self, unlink=False):
+        # Aucune vue sur le tampon ne doit survivre à la fermeture
+        self.array = None
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Côté worker
+
+_worker_process_image = None
+
+
+def _init_worker(module, opencv_threads):
+    global _worker_process_image
+    cv2.setNumThreads(opencv_threads)
+    _worker_process_image = importlib.import_module(module).process_image
+
+
+def _worker_ping():
+    return os.getpid()
+
+
+def _worker_run(operation, descriptor, params):
+    """Traite l'image partagée ; retourne le descripteur du résultat (ou None)."""
+    source = SharedArray.attach(descriptor)
+    try:
+        result = _worker_process_image(operation, source.array, params)
+        if result is None:
+            return None
+        output = SharedArray.copy_of(result)
+        # Le résultat peut être une vue de l'entrée (recadrage...)
+        result = None
+        output_descriptor = output.descriptor()
+        output.close()
+        return output_descriptor
+    finally:
+        result = None
+        source.close()
+
+
+def _discard_result(future):
+    """Libère le segment d'un résultat arrivé après l'abandon de la requête."""
+    try:
+        descriptor = future.result()
+    except Exception:
+        return
+    if descriptor is not None:
+        SharedArray.attach(descriptor).close(unlink=True)
+
+
+class ProcessBackend:
+    """
+    Aiguillage d'une opération : pool de processus pour les classes de
+    `classes`, appel direct de `process_image` pour les autres (et en
+    repli si le pool est cassé). Sans workers, tout reste local.
+    """
+
+    def __init__(self, process_image, workers=0, classes=(), timeout=30.0):
+        self.process_image = process_image
+        self.module = process_image.__module__
+        self.workers = workers
+        self.classes = tuple(classes)
+        self.timeout = timeout
+        self.opencv_threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._seconds = 0.0
+
+    @property
+    def enabled(self):
+        return HAS_SHARED_MEMORY and self.workers > 0 and bool(self.classes)
+
+    def handles(self, operation):
+        return self.enabled and operation_class(operation) in self.classes
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # « spawn » : pas de fork d'un serveur multithreadé (verrous
+                # d'OpenCV ou de la journalisation hérités dans un état incohérent)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.module, self.opencv_threads))
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False)
+
+    def start(self):
+        """Démarre les workers sans attendre (démarrage d'un worker : ~1 s)."""
+        if self.enabled:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_worker_ping)
+
+    def process(self, operation, image, params=None, original_image=None, planes=None, buffers=None):
+        """Même contrat que process_image ; exécuté dans le pool si l'opération y est affectée."""
+        if not self.handles(operation):
+            return self.process_image(operation, image, params, original_image, planes, buffers)
+
+        working_image = original_image if original_image is not None else image
+        executor = self._get_executor()
+        started = time.perf_counter()
+        submitted = False
+        try:
+            source = SharedArray.copy_of(working_image)
+            try:
+                future = executor.submit(_worker_run, operation, source.descriptor(), dict(params or {}))
+                submitted = True
+                descriptor = future.result(self.timeout)
+            except BrokenProcessPool:
+                # Worker tué (mémoire, signal) : nouveau pool à la prochaine requête
+                self._reset(executor)
+                self._count(fallbacks=1)
+                return self.process_image(operation, image, params, original_image, planes, buffers)
+            except FutureTimeout:
+                # Worker bloqué : la requête est traitée ici, le segment du
+                # résultat tardif sera libéré à son arrivée
+                future.add_done_callback(_discard_result)
+                self._count(timeouts=1, fallbacks=1)
+                return self.process_image(operation, image, params, original_image, planes, buffers)
+            finally:
+                source.close(unlink=True)
+
+            if descriptor is None:
+                return None
+            output = SharedArray.attach(descriptor)
+            try:
+                array = output.array
+                result = buffers.get('out', array.shape, array.dtype) if buffers is not None else None
+                if result is None:
+                    result = np.empty(array.shape, array.dtype)
+                np.copyto(result, array)
+                array = None
+            finally:
+                output.close(unlink=True)
+            return result
+        finally:
+            # Durée de toute requête confiée au pool, replis compris
+            if submitted:
+                self._count(submitted=1, seconds=time.perf_counter() - started)
+
+    def _count(self, submitted=0, fallbacks=0, timeouts=0, seconds=0.0):
+        with self._lock:
+            self.submitted += submitted
+            self.fallbacks += fallbacks
+            self.timeouts += timeouts
+            self._seconds += seconds
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            counters = (self.submitted, self.fallbacks, self.timeouts, self.restarts, self._seconds)
+        submitted, fallbacks, timeouts, restarts, seconds = counters
+        return {
+            'enabled': self.enabled,
+            'workers': self.workers,
+            'classes': list(self.classes),
+            'operations': [op for cls in self.classes for op in OPERATION_CLASSES.get(cls, ())],
+            'opencv_threads': self.opencv_threads if self.enabled else None,
+            'submitted': submitted,
+            'fallbacks': fallbacks,
+            'timeouts': timeouts,
+            'restarts': restarts,
+            'avg_ms': round(seconds / submitted * 1000, 2) if submitted else None
+        }
@@ -0,0 +1,133 @@
+import hashlib
+import math
+import re
+
+_INT_RE = re.compile(r'^-?\d+$')
+_FLOAT_RE = re.compile(r'^-?(\d+\.\d*|\.\d+|\d+)([eE]-?\d+)?$')
+
+
+class RecipeError(ValueError):
+    """Liste d'opérations mal formée."""
+
+
+# Paramètres acceptés par opération : ('int' | 'number', min, max) ou
+# ('choice', valeurs). process_image borne déjà certaines valeurs ; ne
+# sont refusés ici que les types et valeurs qui le feraient échouer (il
+# renverrait alors l'image intacte, mise en cache comme un rendu réussi).
+# Les bornes qui dépendent de l'image (recadrage) sont vérifiées au rendu.
+PARAMETERS = {
+    'grayscale': {},
+    'resize': {'width': ('int', 1, 10000), 'height': ('int', 1, 10000)},
+    'blur': {'method': ('choice', ('gaussian', 'median', 'average', 'bilateral', 'motion')),
+             'kernel_size': ('int', None, None)},
+    'brightness': {'value': ('number', None, None)},
+    'contrast': {'value': ('number', None, None)},
+    'rotate': {'angle': ('number', None, None)},
+    'flip': {'mode': ('choice', ('horizontal', 'vertical'))},
+    'crop': {'x': ('int', 0, None), 'y': ('int', 0, None),
+             'width': ('int', 1, None), 'height': ('int', 1, None)},
+    'threshold': {'type': ('choice', ('binary', 'adaptive', 'mean', 'otsu')),
+                  'value': ('number', None, None)},
+    'channel_split': {'channel': ('choice', ('red', 'green', 'blue'))},
+    'equalize': {},
+    'edge_detection': {'detector': ('choice', ('canny', 'sobel', 'laplacian')),
+                       'low': ('number', 0, None), 'high': ('number', 0, None)},
+    'histogram_equalization': {},
+}
+
+
+def validate_params(name, params):
+    """Lève RecipeError si un paramètre est inconnu, mal typé ou hors bornes."""
+    spec = PARAMETERS.get(name)
+    if spec is None:
+        return
+    for key, value in params.items():
+        if key not in spec:
+            raise RecipeError(f"Paramètre inconnu pour {name}: {key}")
+        kind, *rule = spec[key]
+        if kind == 'choice':
+            if value not in rule[0]:
+                raise RecipeError(f"{name}.{key} doit valoir {', '.join(rule[0])}")
+            continue
+        # inf et nan (« 1e400 ») : process_image échouerait sans le signaler
+        numeric = (isinstance(value, (int, float)) and not isinstance(value, bool)
+                   and math.isfinite(value))
+        if not numeric or (kind == 'int' and not isinstance(value, int)):
+            expected = 'entier' if kind == 'int' else 'nombre'
+            raise RecipeError(f"{name}.{key} doit être un {expected}: {value}")
+        low, high = rule
+        if low is not None and value < low:
+            raise RecipeError(f"{name}.{key} doit être >= {low}: {value}")
+        if high is not None and value > high:
+            raise RecipeError(f"{name}.{key} doit être <= {high}: {value}")
+
+
+def _parse_value(raw):
+    value = raw.strip()
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    if _INT_RE.match(value):
+        return int(value)
+    if _FLOAT_RE.match(value):
+        number = float(value)
+        if not math.isfinite(number):
+            # Refusé par validate_params comme valeur non numérique
+            return value
+        # 90.0 et 90 désignent la même recette
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def parse_recipe(ops, known_operations=None):
+    """
+    Lit une liste d'opérations au format
+    `op1:clé=valeur,clé=valeur|op2|op3:clé=valeur`.
+
+    Retourne une liste de (opération, paramètres) ; les valeurs
+    numériques sont converties. Lève RecipeError si la liste est invalide
+    ou si un paramètre ne respecte pas PARAMETERS.
+    """
+    steps = []
+    for chunk in (ops or '').split('|'):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        name, _, raw_params = chunk.partition(':')
+        name = name.strip().lower()
+        if known_operations is not None and name not in known_operations:
+            raise RecipeError(f"Opération inconnue: {name}")
+        params = {}
+        for pair in raw_params.split(','):
+            if not pair.strip():
+                continue
+            key, sep, value = pair.partition('=')
+            if not sep or not key.strip():
+                raise RecipeError(f"Paramètre invalide: {pair}")
+            params[key.strip()] = _parse_value(value)
+        validate_params(name, params)
+        steps.append((name, params))
+    return steps
+
+
+def canonical_recipe(steps):
+    """Forme canonique d'une recette : paramètres triés, valeurs normalisées."""
+    parts = []
+    for name, params in steps:
+        if params:
+            encoded = ','.join(f'{k}={_format_value(params[k])}' for k in sorted(params))
+            parts.append(f'{name}:{encoded}')
+        else:
+            parts.append(name)
+    return '|'.join(parts)
+
+
+def render_etag(image_id, canonical, *variant):
+    """ETag fort dérivé de l'empreinte de l'image et de la recette."""
+    key = '\n'.join([image_id, canonical] + [str(v) for v in variant])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
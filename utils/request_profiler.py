@@ -0,0 +1,153 @@
+"""
+Profilage d'une requête à la demande (cProfile).
+
+Seul le thread de la requête est profilé, de son entrée dans Flask à la
+réponse. Le temps propre de chaque fonction est réparti par catégorie
+(OpenCV, numpy, encodage, Flask, attente, application) et les derniers
+rapports sont gardés en mémoire pour l'administration. Sans demande de
+profilage, rien n'est activé.
+"""
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+
+# Fonctions d'OpenCV telles que cProfile les nomme ('<GaussianBlur>')
+_OPENCV_NAMES = frozenset(f'<{name}>' for name in dir(cv2) if not name.startswith('_'))
+
+_ENCODING_NAMES = ('<imencode>', '<imdecode>', 'binascii.', 'zlib.', '_json.', "'_io.BytesIO'")
+_ENCODING_FILES = ('image_codecs.py', f'{os.sep}base64.py', f'{os.sep}json{os.sep}',
+                   f'{os.sep}PIL{os.sep}')
+_FLASK_FILES = tuple(f'{os.sep}{package}{os.sep}' for package in
+                     ('flask', 'werkzeug', 'jinja2', 'flask_cors', 'click'))
+_WAIT_NAMES = ("'acquire' of '_thread.", "'wait' of", '<built-in method time.sleep>')
+
+CATEGORIES = ('opencv', 'numpy', 'encoding', 'flask', 'wait', 'app', 'other')
+
+
+def categorize(key, root=None):
+    """Catégorie d'une entrée pstats (fichier, ligne, fonction)."""
+    filename, _, name = key
+    if filename == '~':
+        if any(part in name for part in _ENCODING_NAMES):
+            return 'encoding'
+        if name in _OPENCV_NAMES or "'cv2." in name:
+            return 'opencv'
+        if 'numpy.' in name:
+            return 'numpy'
+        if any(part in name for part in _WAIT_NAMES):
+            return 'wait'
+        return 'other'
+    if any(part in filename for part in _ENCODING_FILES):
+        return 'encoding'
+    if f'{os.sep}numpy{os.sep}' in filename:
+        return 'numpy'
+    if any(part in filename for part in _FLASK_FILES):
+        return 'flask'
+    if filename.endswith(f'{os.sep}threading.py'):
+        return 'wait'
+    if root is not None and filename.startswith(root) and 'site-packages' not in filename:
+        return 'app'
+    return 'other'
+
+
+def _label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{line}({name})'
+
+
+class RequestProfiler:
+    """
+    Rapports de profilage des dernières requêtes profilées (`keep` au
+    plus). `root` : dossier de l'application (catégorie 'app').
+    """
+
+    def __init__(self, keep=20, root=None, top=25):
+        self.keep = keep
+        self.root = root
+        self.top = top
+        self._reports = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """Démarre le profilage du thread courant ; None si impossible."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif (Python >= 3.12 : un seul à la fois)
+            return None
+        profile.started = time.perf_counter()
+        return profile
+
+    def end(self, profile, **meta):
+        """Arrête le profilage et enregistre le rapport ; retourne le rapport."""
+        profile.disable()
+        wall = time.perf_counter() - profile.started
+        stats = pstats.Stats(profile)
+
+        categories = dict.fromkeys(CATEGORIES, 0.0)
+        functions = []
+        for key, (_, calls, tottime, cumtime, _) in stats.stats.items():
+            category = categorize(key, self.root)
+            categories[category] += tottime
+            functions.append((key, category, calls, tottime, cumtime))
+
+        def rows(index):
+            ranked = sorted(functions, key=lambda f: f[index], reverse=True)[:self.top]
+            return [{
+                'function': _label(key),
+                'category': category,
+                'calls': calls,
+                'self_ms': round(tottime * 1000, 3),
+                'cumulative_ms': round(cumtime * 1000, 3)
+            } for key, category, calls, tottime, cumtime in ranked]
+
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(self.top)
+
+        report = dict(meta, **{
+            'timestamp': datetime.now().isoformat(),
+            'wall_ms': round(wall * 1000, 3),
+            'profiled_ms': round(stats.total_tt * 1000, 3),
+            'categories_ms': {name: round(seconds * 1000, 3) for name, seconds in categories.items()},
+            'top_self': rows(3),
+            'top_cumulative': rows(4),
+            'text': text.getvalue()
+        })
+        with self._lock:
+            report['id'] = str(next(self._ids))
+            self._reports[report['id']] = report
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+        return report
+
+    def get(self, report_id):
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def summaries(self):
+        """Derniers rapports, sans le détail des fonctions."""
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{key: report[key] for key in
+                 ('id', 'timestamp', 'method', 'path', 'status', 'wall_ms', 'categories_ms')
+                 if key in report} for report in reversed(reports)]
+
+
+def server_timing(report):
+    """Valeur de l'en-tête Server-Timing (visible dans les outils du navigateur)."""
+    parts = [f'{name};dur={ms}' for name, ms in report['categories_ms'].items() if ms > 0]
+    parts.append(f"total;dur={report['wall_ms']}")
+    return ', '.join(parts)
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+
+# Priorités (plus petit = servi en premier)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DOWNLOAD = 1
+PRIORITY_BATCH = 2
+
+
+class SchedulerBusy(Exception):
+    """
+    Levée quand une opération lourde ne peut pas être admise : file pleine
+    ou attente trop longue. `retry_after` est une estimation en secondes.
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlotCancelled(Exception):
+    """Levée quand une requête en file est annulée avant d'être admise."""
+
+
+class ComputeScheduler:
+    """
+    Ordonnanceur des opérations lourdes (OpenCV + encodage).
+
+    - au plus `max_concurrent` opérations s'exécutent en même temps ;
+    - les requêtes en attente sont servies par priorité puis par ordre
+      d'arrivée ;
+    - au-delà de `max_queue` requêtes en attente, l'admission est refusée
+      immédiatement (SchedulerBusy) au lieu de laisser la file grossir ;
+    - le pool interne d'OpenCV est dimensionné pour que
+      `max_concurrent` x threads OpenCV ne dépasse pas le nombre de cœurs.
+    """
+
+    def __init__(self, max_concurrent=None, max_queue=16, queue_timeout=10.0):
+        cpu_count = os.cpu_count() or 1
+        if max_concurrent is None:
+            max_concurrent = max(1, min(4, cpu_count))
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.opencv_threads = max(1, cpu_count // max_concurrent)
+        cv2.setNumThreads(self.opencv_threads)
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._counter = itertools.count()
+        self._active = 0
+        # Moyenne glissante de la durée d'une opération (estimation Retry-After)
+        self._avg_duration = 0.1
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def _retry_after(self):
+        backlog = len(self._waiting) + self._active
+        estimate = backlog * self._avg_duration / self.max_concurrent
+        return max(1, int(math.ceil(estimate)))
+
+    def _admit(self, priority, cancelled=None):
+        """Attend un créneau ; retourne quand l'opération peut démarrer."""
+        with self._cond:
+            if cancelled is not None and cancelled():
+                self.cancelled += 1
+                raise SlotCancelled()
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                return
+            if len(self._waiting) >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerBusy('File de traitement pleine', self._retry_after())
+
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._waiting, ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not (self._waiting[0] == ticket and self._active < self.max_concurrent):
+                    if cancelled is not None and cancelled():
+                        self.cancelled += 1
+                        raise SlotCancelled()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise SchedulerBusy('Délai d\'attente dépassé', self._retry_after())
+                    self._cond.wait(remaining)
+                heapq.heappop(self._waiting)
+                self._active += 1
+                # Plusieurs créneaux ont pu se libérer d'un coup : la nouvelle
+                # tête de file doit réévaluer sa condition
+                self._cond.notify_all()
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+    def _release(self, duration):
+        with self._cond:
+            self._active -= 1
+            self.completed += 1
+            self._avg_duration = 0.9 * self._avg_duration + 0.1 * duration
+            self._cond.notify_all()
+
+    def wake(self):
+        """Réveille les requêtes en file pour qu'elles réévaluent `cancelled`."""
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, cancelled=None):
+        """
+        Exécute le bloc dans un créneau de calcul (peut lever SchedulerBusy).
+
+        `cancelled` est un prédicat réévalué pendant l'attente : s'il devient
+        vrai, la requête quitte la file avec SlotCancelled.
+        """
+        self._admit(priority, cancelled)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(time.perf_counter() - start)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'opencv_threads': self.opencv_threads,
+                'active': self._active,
+                'queued': len(self._waiting),
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'avg_duration_ms': round(self._avg_duration * 1000, 2)
+            }
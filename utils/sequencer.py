@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RequestSequencer:
+    """
+    Suivi « dernière requête gagnante » par session client.
+
+    Chaque requête interactive porte un numéro de séquence croissant. Dès
+    qu'une requête plus récente arrive pour la même session, les plus
+    anciennes sont périmées : elles sont retirées de la file ou leur
+    résultat n'est pas encodé.
+
+    Les clés viennent du client : au plus `max_sessions` sessions sont
+    suivies (la moins récemment active est oubliée d'abord) et une session
+    inactive depuis `max_idle` secondes est oubliée.
+    """
+
+    def __init__(self, max_sessions=10000, max_idle=3600):
+        self.max_sessions = max_sessions
+        self.max_idle = max_idle
+        # clé -> (dernier numéro, instant de la dernière requête), du moins
+        # récemment actif au plus récent
+        self._latest = OrderedDict()
+        self._coalesced = {}
+        self._lock = threading.Lock()
+        self.total_coalesced = 0
+        self.evicted = 0
+
+    def _evict(self, key):
+        self._latest.pop(key, None)
+        self._coalesced.pop(key, None)
+
+    def _expire(self, now):
+        while self._latest:
+            oldest, (_, seen) = next(iter(self._latest.items()))
+            if now - seen <= self.max_idle and len(self._latest) < self.max_sessions:
+                break
+            self._evict(oldest)
+            self.evicted += 1
+
+    def announce(self, key, seq):
+        """Enregistre l'arrivée de la requête `seq` ; False si déjà périmée."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._latest.get(key)
+            if entry is not None and seq < entry[0]:
+                return False
+            if entry is None:
+                self._expire(now)
+            self._latest[key] = (seq, now)
+            self._latest.move_to_end(key)
+            return True
+
+    def is_stale(self, key, seq):
+        with self._lock:
+            entry = self._latest.get(key)
+            return entry is not None and seq < entry[0]
+
+    def record_drop(self, key):
+        """Compte une requête abandonnée ; retourne le total de la session."""
+        with self._lock:
+            self.total_coalesced += 1
+            count = self._coalesced.get(key, 0) + 1
+            # Pas de compteur pour une session déjà oubliée
+            if key in self._latest:
+                self._coalesced[key] = count
+            return count
+
+    def coalesced(self, key):
+        with self._lock:
+            return self._coalesced.get(key, 0)
+
+    def forget(self, key):
+        with self._lock:
+            self._evict(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._latest),
+                'coalesced': self.total_coalesced,
+                'evicted': self.evicted
+            }
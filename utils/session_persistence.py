@@ -0,0 +1,175 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+ORIGINALS_DIR = 'originals'
+
+
+class SessionPersistence:
+    """
+    Sauvegarde sur disque des sessions : un fichier .npy brut par
+    original (rechargé en mmap, à la demande) et un petit index JSON.
+
+    Les écritures passent par un thread dédié : les requêtes ne font que
+    déposer une tâche. Dans un lot, les originaux sont écrits avant
+    l'index, et supprimés après : l'index ne référence jamais un fichier
+    absent, même après un arrêt brutal.
+
+    Le même thread appelle `expire` (s'il est défini) toutes les
+    `expire_interval` secondes pour oublier les sessions trop anciennes.
+    """
+
+    def __init__(self, folder, expire_interval=60.0):
+        self.folder = folder
+        self.originals_dir = os.path.join(folder, ORIGINALS_DIR)
+        os.makedirs(self.originals_dir, exist_ok=True)
+        # Fournit le contenu de l'index au moment de l'écriture
+        self.snapshot = None
+        # Expiration des sessions anciennes, appelée depuis le thread d'écriture
+        self.expire = None
+        self.expire_interval = expire_interval
+        self._next_expiry = 0.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.errors = 0
+
+    def _path(self, digest):
+        return os.path.join(self.originals_dir, f'{digest}.npy')
+
+    # Lecture (au démarrage et à la demande)
+
+    def load_index(self):
+        """Index enregistré, ou {} s'il est absent ou illisible."""
+        try:
+            with open(os.path.join(self.folder, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load_array(self, digest):
+        """Original en lecture seule, projeté en mémoire (mmap) ; None si absent."""
+        try:
+            return np.load(self._path(digest), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    # Écritures asynchrones
+
+    def save_original(self, digest, image):
+        self._submit(('save', digest, image))
+
+    def delete_original(self, digest):
+        self._submit(('delete', digest, None))
+
+    def save_index(self):
+        self._submit(('index', None, None))
+
+    def start(self):
+        """Démarre le thread d'écriture (et donc l'expiration périodique)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='session-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _submit(self, task):
+        self.start()
+        self._queue.put(task)
+
+    def _expire_due(self):
+        if self.expire is None or time.monotonic() < self._next_expiry:
+            return
+        self._next_expiry = time.monotonic() + self.expire_interval
+        try:
+            self.expire()
+        except Exception as e:
+            logger.error("✗ Erreur expiration sessions: %s", e)
+
+    def _run(self):
+        while True:
+            self._expire_due()
+            try:
+                tasks = [self._queue.get(timeout=self.expire_interval)]
+            except queue.Empty:
+                continue
+            # Regrouper tout ce qui attend : un seul index par lot
+            while True:
+                try:
+                    tasks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(task is None for task in tasks)
+            tasks = [task for task in tasks if task is not None]
+            try:
+                self._write_batch(tasks)
+            except Exception as e:
+                self.errors += 1
+                logger.error("✗ Erreur sauvegarde sessions: %s", e)
+            for _ in range(len(tasks) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, tasks):
+        if not tasks:
+            return
+        # Seule la dernière action sur un original compte (supprimé puis ré-uploadé...)
+        final = {}
+        for kind, digest, image in tasks:
+            if kind in ('save', 'delete'):
+                final[digest] = (kind, image)
+        for digest, (kind, image) in final.items():
+            path = self._path(digest)
+            if kind == 'save' and not os.path.exists(path):
+                tmp = path + '.tmp'
+                with open(tmp, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(image))
+                os.replace(tmp, path)
+                self.writes += 1
+        self._write_index()
+        for digest, (kind, _) in final.items():
+            if kind == 'delete':
+                try:
+                    os.remove(self._path(digest))
+                except OSError:
+                    # Absent, ou encore projeté en mémoire (Windows)
+                    pass
+
+    def _write_index(self):
+        if self.snapshot is None:
+            return
+        path = os.path.join(self.folder, INDEX_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def flush(self):
+        """Attend la fin des écritures en attente."""
+        self._queue.join()
+
+    def close(self):
+        """Écrit ce qui reste puis arrête le thread d'écriture."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(10)
+
+    def stats(self):
+        return {
+            'pending': self._queue.unfinished_tasks,
+            'writes': self.writes,
+            'errors': self.errors
+        }
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+
+def sse_event(event, data):
+    """Formate un événement Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class StreamChannel:
+    """
+    Canal persistant d'un client : les modifications poussées par POST
+    sont consommées par le flux SSE ouvert sur le même identifiant.
+
+    Une seule modification est gardée en attente : une nouvelle poussée
+    remplace la précédente si celle-ci n'a pas encore été traitée.
+    """
+
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        # Dernière image envoyée par le client (base64), réutilisée tant
+        # qu'il n'en envoie pas une nouvelle
+        self.image_data = None
+        self.image_version = None
+        self.closed = False
+        self.coalesced = 0
+        self.last_activity = time.time()
+        self._pending = None
+        self._cond = threading.Condition()
+
+    def push(self, job):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = job
+            self.last_activity = time.time()
+            self._cond.notify_all()
+
+    def next_job(self, timeout):
+        """Retourne la prochaine modification, ou None après `timeout` secondes."""
+        with self._cond:
+            if self._pending is None and not self.closed:
+                self._cond.wait(timeout)
+            job, self._pending = self._pending, None
+            return job
+
+    def has_pending(self):
+        """Vrai si une modification plus récente attend (le travail en cours est périmé)."""
+        with self._cond:
+            return self._pending is not None or self.closed
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class ChannelRegistry:
+    """Canaux de streaming ouverts, indexés par identifiant client."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def open(self, channel_id):
+        """Ouvre (ou rouvre après reconnexion) le canal `channel_id`."""
+        channel = StreamChannel(channel_id)
+        with self._lock:
+            previous = self._channels.get(channel_id)
+            self._channels[channel_id] = channel
+        if previous is not None:
+            previous.close()
+        return channel
+
+    def get(self, channel_id):
+        with self._lock:
+            return self._channels.get(channel_id)
+
+    def close(self, channel_id, channel):
+        channel.close()
+        with self._lock:
+            if self._channels.get(channel_id) is channel:
+                del self._channels[channel_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'coalesced': sum(c.coalesced for c in self._channels.values()),
+                # Dernière image base64 gardée par canal
+                'bytes': sum(len(c.image_data or '') for c in self._channels.values())
+            }
@@ -0,0 +1,141 @@
+"""
+Journalisation structurée et non bloquante.
+
+Les enregistrements portent des champs (route, opération, session,
+durées, octets) en plus du message. Le thread de la requête ne fait que
+les déposer dans une file bornée ; un thread d'écriture les formate
+(texte `clé=valeur` ou JSON, une ligne par événement) et les écrit sur
+la console. Si la file est pleine, l'enregistrement est abandonné et
+compté plutôt que de bloquer la requête.
+
+Les événements des routes à haute fréquence sont échantillonnés
+(`sampled=True`) ; avertissements et erreurs passent toujours.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+_state = {'listener': None, 'handler': None}
+
+
+def log_event(logger, message, level=logging.INFO, sampled=False, **fields):
+    """
+    Journalise `message` avec des champs structurés. Un événement
+    `sampled` n'est gardé qu'avec la probabilité LOG_SAMPLE_RATE.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'fields': fields, 'sampled': sampled})
+
+
+class SamplingFilter(logging.Filter):
+    """Garde une fraction `rate` des événements échantillonnés (sous WARNING)."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING or not getattr(record, 'sampled', False):
+            return True
+        if random.random() < self.rate:
+            record.fields = dict(getattr(record, 'fields', {}), sample_rate=self.rate)
+            return True
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Dépose dans la file sans jamais attendre ; compte les abandons."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Le formatage est fait par le thread d'écriture : seuls le message
+        # et la trace d'exception sont figés ici (les arguments peuvent changer)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """Une ligne par enregistrement : texte `clé=valeur` ou objet JSON."""
+
+    def __init__(self, fmt='text'):
+        super().__init__()
+        self.json = fmt == 'json'
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if self.json:
+            entry = {
+                'ts': round(record.created, 3),
+                'level': record.levelname,
+                'logger': record.name,
+                'thread': record.threadName,
+                'message': record.getMessage()
+            }
+            entry.update(fields)
+            if record.exc_text:
+                entry['exception'] = record.exc_text
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        timestamp = time.strftime('%H:%M:%S', time.localtime(record.created))
+        line = f"{timestamp}.{int(record.msecs):03d} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+def configure_logging(level='INFO', fmt='text', sample_rate=1.0, queue_size=10000, stream=None):
+    """
+    Installe la file de journalisation sur le logger racine (une seule
+    fois par processus). Retourne le handler de file.
+    """
+    if _state['handler'] is not None:
+        return _state['handler']
+    log_queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(fmt))
+    listener = QueueListener(log_queue, output, respect_handler_level=False)
+
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(sample_rate))
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.addHandler(handler)
+
+    listener.start()
+    # Vider la file à l'arrêt
+    atexit.register(listener.stop)
+    _state.update(listener=listener, handler=handler)
+    return handler
+
+
+def logging_stats():
+    handler = _state['handler']
+    if handler is None:
+        return {'configured': False}
+    return {
+        'configured': True,
+        'level': logging.getLevelName(logging.getLogger().level),
+        'queued': handler.queue.qsize(),
+        'dropped': handler.dropped
+    }
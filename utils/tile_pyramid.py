@@ -0,0 +1,155 @@
+import math
+import threading
+from collections import OrderedDict
+
+import cv2
+
+TILE_SIZE = 256
+
+
+class TilePyramid:
+    """
+    Pyramide multi-résolution d'une image, convention Deep Zoom : le
+    niveau `max_level` est l'image pleine résolution, chaque niveau
+    inférieur est deux fois plus petit, jusqu'au niveau 0 (1×1 pixel).
+
+    Les niveaux ne sont réduits qu'à la première tuile demandée, et les
+    tuiles encodées sont gardées par niveau.
+    """
+
+    def __init__(self, image, tile_size=TILE_SIZE, shared_base=False):
+        self.height, self.width = image.shape[:2]
+        self.tile_size = tile_size
+        self.max_level = math.ceil(math.log2(max(self.width, self.height, 1)))
+        # Base partagée (original du store) : pas comptée dans nbytes
+        self.shared_base = shared_base
+        self._levels = {self.max_level: image}
+        self._tiles = {}
+        self._tile_bytes = 0
+        self._lock = threading.Lock()
+
+    def level_size(self, level):
+        scale = 2 ** (self.max_level - level)
+        return math.ceil(self.width / scale), math.ceil(self.height / scale)
+
+    def tile_grid(self, level):
+        """Nombre de tuiles (colonnes, lignes) du niveau."""
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def has_tile(self, level, x, y):
+        if not 0 <= level <= self.max_level:
+            return False
+        columns, rows = self.tile_grid(level)
+        return 0 <= x < columns and 0 <= y < rows
+
+    def level_image(self, level):
+        """Image du niveau, réduite par moitiés successives depuis le niveau connu le plus proche."""
+        with self._lock:
+            if level in self._levels:
+                return self._levels[level]
+            source = min(l for l in self._levels if l > level)
+            image = self._levels[source]
+            for current in range(source - 1, level - 1, -1):
+                image = cv2.resize(image, self.level_size(current), interpolation=cv2.INTER_AREA)
+                self._levels[current] = image
+            return image
+
+    def tile_image(self, level, x, y):
+        """Pixels d'une tuile (vue dans l'image du niveau)."""
+        size = self.tile_size
+        return self.level_image(level)[y * size:(y + 1) * size, x * size:(x + 1) * size]
+
+    def get_tile(self, level, x, y, variant):
+        """Tuile encodée en cache ; `variant` distingue recette et format."""
+        with self._lock:
+            return self._tiles.get(level, {}).get((x, y, variant))
+
+    def put_tile(self, level, x, y, variant, data):
+        with self._lock:
+            tiles = self._tiles.setdefault(level, {})
+            previous = tiles.get((x, y, variant))
+            if previous is not None:
+                self._tile_bytes -= len(previous)
+            tiles[(x, y, variant)] = data
+            self._tile_bytes += len(data)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            total = sum(image.nbytes for l, image in self._levels.items()
+                        if not (self.shared_base and l == self.max_level))
+            return total + self._tile_bytes
+
+    def describe(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'tile_size': self.tile_size,
+            'overlap': 0,
+            'levels': self.max_level + 1
+        }
+
+
+class PyramidCache:
+    """
+    Cache LRU des pyramides, indexé par (identifiant d'image, recette
+    canonique). Les pyramides grossissent avec les tuiles demandées :
+    `touch` réévalue le budget après un ajout.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def peek(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def get_or_build(self, key, loader, shared_base=False):
+        """
+        Pyramide de `key` ; à défaut, `loader()` fournit l'image pleine
+        résolution (None si impossible).
+        """
+        pyramid = self.peek(key)
+        if pyramid is not None:
+            self.touch(key)
+            return pyramid
+        image = loader()
+        if image is None:
+            return None
+        with self._lock:
+            # Une autre requête a pu construire la même pyramide entre-temps
+            pyramid = self._entries.get(key)
+            if pyramid is None:
+                pyramid = TilePyramid(image, shared_base=shared_base)
+                self._entries[key] = pyramid
+                self.builds += 1
+        self.touch(key)
+        return pyramid
+
+    def touch(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            total = sum(p.nbytes for p in self._entries.values())
+            # Garder toujours la pyramide la plus récente
+            while total > self.max_bytes and len(self._entries) > 1:
+                _, pyramid = self._entries.popitem(last=False)
+                total -= pyramid.nbytes
+
+    def invalidate_image(self, image_id):
+        """Oublie toutes les pyramides d'une image (original libéré)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == image_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pyramids': len(self._entries),
+                'bytes': sum(p.nbytes for p in self._entries.values()),
+                'builds': self.builds
+            }
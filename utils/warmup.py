@@ -0,0 +1,170 @@
+import atexit
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from utils.buffer_pool import buffer_pool
+from utils.image_codecs import codec_registry
+from utils.plane_cache import DerivedPlanes
+from utils.structured_log import log_event
+
+logger = logging.getLogger(__name__)
+
+# Variantes exécutées au préchauffage : chaque variante initialise ses
+# propres noyaux OpenCV (Otsu, adaptatif, Sobel, Laplacien...)
+WARMUP_PARAMS = {
+    'resize': [{'width': 160, 'height': 120}],
+    'blur': [{'method': 'gaussian'}, {'method': 'median'}, {'method': 'average'},
+             {'method': 'bilateral'}, {'method': 'motion'}],
+    'brightness': [{'value': 20}],
+    'contrast': [{'value': 20}],
+    'rotate': [{'angle': 30}],
+    'flip': [{'mode': 'horizontal'}, {'mode': 'vertical'}],
+    'crop': [{'x': 10, 'y': 10, 'width': 100, 'height': 80}],
+    'threshold': [{'type': 'binary', 'value': 127}, {'type': 'otsu'},
+                  {'type': 'adaptive'}, {'type': 'mean'}],
+    'channel_split': [{'channel': 'red'}],
+    'edge_detection': [{'detector': 'canny'}, {'detector': 'sobel'},
+                       {'detector': 'laplacian'}],
+}
+
+
+def synthetic_image(width=320, height=240):
+    """Petite image BGR avec dégradés et bruit : chaque opération a du travail réel."""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 32, (height, width), dtype=np.uint8)
+    image = np.empty((height, width, 3), np.uint8)
+    image[:, :, 0] = x
+    image[:, :, 1] = y
+    image[:, :, 2] = noise * 4
+    cv2.circle(image, (width // 2, height // 2), min(width, height) // 4, (255, 255, 255), -1)
+    return image
+
+
+def warm_up(process_image, operations):
+    """
+    Exécute une fois chaque opération enregistrée et chaque codec (de
+    chaque backend) sur une image synthétique, par le même chemin que les requêtes (plans dérivés,
+    tampons du pool). Retourne le rapport des durées en millisecondes.
+    """
+    image = synthetic_image()
+    planes = DerivedPlanes(image)
+    report = {'operations': {}, 'failures': []}
+
+    started = time.perf_counter()
+    # Plans dérivés : conversions de couleur et gradients
+    planes.gray, planes.ycrcb, planes.hsv, planes.sobel
+    report['planes_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    for operation in operations:
+        op_started = time.perf_counter()
+        for params in WARMUP_PARAMS.get(operation, [{}]):
+            try:
+                with buffer_pool.lease() as buffers:
+                    result = process_image(operation, image, dict(params),
+                                           planes=planes, buffers=buffers)
+                if result is None:
+                    report['failures'].append(operation)
+            except Exception as e:
+                report['failures'].append(f'{operation}: {e}')
+        report['operations'][operation] = round((time.perf_counter() - op_started) * 1000, 2)
+
+    report['codecs'] = codec_registry.warm_up()
+    report['failures'] += [f'codec {name}' for name, ms in report['codecs'].items() if ms is None]
+
+    hist_started = time.perf_counter()
+    cv2.calcHist([image], [0], None, [256], [0, 256])
+    cv2.calcHist([planes.hsv], [0, 1], None, [30, 32], [0, 180, 0, 256])
+    report['histogram_ms'] = round((time.perf_counter() - hist_started) * 1000, 2)
+
+    report['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+
+class Readiness:
+    """
+    État de démarrage du serveur : prêt une fois le préchauffage terminé.
+    `started_at` est l'instant (time.perf_counter) du début de l'import.
+    """
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.imported_at = None
+        self.ready_at = None
+        self.report = None
+        self.details = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark_imported(self):
+        self.imported_at = time.perf_counter()
+
+    def mark_ready(self, report):
+        with self._lock:
+            self.report = report
+            self.ready_at = time.perf_counter()
+
+    @property
+    def ready(self):
+        return self.ready_at is not None
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def start(self, process_image, operations, benchmark_codecs=True):
+        """
+        Lance le préchauffage dans un thread de fond. Le benchmark des
+        codecs (plusieurs secondes) suit, une fois le serveur prêt :
+        OpenCV est utilisé d'ici là.
+        """
+        def run():
+            try:
+                report = warm_up(process_image, operations)
+            except Exception as e:
+                # Le serveur reste utilisable : l'échec est signalé dans /api/ready
+                report = {'error': str(e)}
+            self.mark_ready(report)
+            if 'error' in report:
+                log_event(logger, "✗ Échec du préchauffage", logging.WARNING, error=report['error'])
+            else:
+                log_event(logger, "✓ Préchauffage terminé", duration_ms=report.get('total_ms', 0),
+                          startup_s=round(self.ready_at - self.started_at, 2))
+            if benchmark_codecs and len(codec_registry.backends) > 1:
+                started = time.perf_counter()
+                benchmark = codec_registry.benchmark(stop=self._stop)
+                if benchmark is None:
+                    return
+                choices = benchmark['choices']
+                log_event(logger, "✓ Benchmark codecs", duration_s=round(time.perf_counter() - started, 1),
+                          cases=len(choices), default=codec_registry.default,
+                          overrides=sum(name != codec_registry.default for name in choices.values()))
+        self._thread = threading.Thread(target=run, name='warmup', daemon=True)
+        self._thread.start()
+        # Un thread tué en plein appel OpenCV fait avorter l'interpréteur
+        atexit.register(self.shutdown)
+        return self._thread
+
+    def shutdown(self, timeout=5):
+        """Interrompt le benchmark et attend la fin du thread de préchauffage."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        with self._lock:
+            status = {'ready': self.ready}
+            status.update(self.details)
+            if self.imported_at is not None:
+                status['import_seconds'] = round(self.imported_at - self.started_at, 3)
+            if self.ready:
+                status['startup_seconds'] = round(self.ready_at - self.started_at, 3)
+                status['warmup'] = self.report
+            status['codecs'] = codec_registry.stats()
+            return status